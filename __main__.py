@@ -1,21 +1,302 @@
+import argparse
+import array
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import csv
+import hashlib
+import itertools
+import json
+import marshal
 import math
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import struct
+import sys
+import time
+import tracemalloc
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+"""
+Column backends store every column of the table in a packed form, and build the statement columns in that form.
+The logical operators only need Python's &, |, and ^, which every backend supports, so each operator is a single
+operation over a whole column. Negation is an ^ against the backend's column of ones.
+"""
+class IntColumns:
+    # Packs a whole column into one arbitrary-precision int, where bit i holds the value at row start + i.
+    # Columns hold every row of a table of the given size, unless they are limited to rows [start, stop)
+    def __init__(self, size: int, start=0, stop=None):
+        self.size = size
+        self.start = start
+        self.rows = (size if stop is None else stop) - start
+        self.zeros = 0
+        self.ones = (1 << self.rows) - 1
+
+    # A complicated, yet compact and efficient, algorithm for populating all the combinations.
+    # The ith statement is a run of zeros followed by a run of ones, each half as long as the previous statement's.
+    # That block is tiled across the column by repeatedly doubling it, so only log(size) big-int shifts are needed,
+    # and then shifted to line up with the first row of the column. If a run is at least as long as the column,
+    # the column is just the end of one run followed by the start of the next
+    def statement(self, i: int) -> int:
+        half = self.size >> (i + 1)
+        if half >= self.rows:
+            first_run = (1 << min(half - self.start % half, self.rows)) - 1
+            return first_run if (self.start // half) & 1 else self.ones ^ first_run
+
+        phase = self.start % (2 * half)
+        column = ((1 << half) - 1) << half
+        width = 2 * half
+        while width < self.rows + phase:
+            column |= column << width
+            width *= 2
+        return (column >> phase) & self.ones
+
+    # The column as little-endian bytes, i.e. row i is bit i % 8 of byte i // 8
+    def packed(self, column: int) -> bytes:
+        return column.to_bytes(-(-self.rows // 8), "little")
+
+    # The inverse of packed
+    def from_packed(self, packed) -> int:
+        return int.from_bytes(packed, "little") & self.ones
+
+    # Repeats every row of a column from a table with one less statement, which is that column once a new statement
+    # is added after the others. In binary, that doubles every digit
+    def repeat_rows(self, column: int) -> int:
+        digits = format(column, f"0{self.rows // 2}b")
+        return int(digits.replace("0", "00").replace("1", "11"), 2)
+
+    # The list view of a packed column, i.e. one int per row
+    def unpack(self, column: int) -> list[int]:
+        return [int(i) for i in packed_bits(self.packed(column), 0, self.rows)]
+
+
+class NumpyColumns:
+    # Packs a column into an array of 64-bit words with the same bit layout as IntColumns, so every operator is one
+    # vectorized NumPy call over rows/64 words
+    def __init__(self, size: int, start=0, stop=None):
+        self.size = size
+        self.start = start
+        self.rows = (size if stop is None else stop) - start
+        self.words = -(-self.rows // 64)
+        self.zeros = np.zeros(self.words, "<u8")
+
+        # The last word only has as many bits set as there are rows left, since it may not be full
+        self.ones = np.full(self.words, 2**64 - 1, "<u8")
+        self.ones[-1] = np.uint64((1 << (self.rows - 64 * (self.words - 1))) - 1)
+
+    # Same layout as IntColumns.statement. Runs of at least a word are set as (blocks, zeros/ones, words) slices,
+    # while shorter runs repeat the same word pattern throughout the column. Columns that only hold some of the
+    # rows are built by IntColumns instead, since they don't line up with the blocks
+    def statement(self, i: int):
+        half = self.size >> (i + 1)
+        if self.start or self.rows != self.size:
+            column = IntColumns(self.size, self.start, self.start + self.rows).statement(i)
+            return np.frombuffer(column.to_bytes(self.words * 8, "little"), "<u8").copy()
+        elif half >= 64:
+            column = np.zeros((self.words // (half // 32), 2, half // 64), "<u8")
+            column[:, 1, :] = np.uint64(2**64 - 1)
+            return column.reshape(self.words)
+
+        pattern = ((1 << half) - 1) << half
+        width = 2 * half
+        while width < 64:
+            pattern |= pattern << width
+            width *= 2
+        return np.full(self.words, pattern, "<u8") & self.ones
+
+    # The words are little-endian, so their bytes already have the same layout as IntColumns.packed
+    def packed(self, column) -> memoryview:
+        return memoryview(column.view(np.uint8))
+
+    def from_packed(self, packed):
+        column = np.zeros(self.words, "<u8")
+        packed = np.frombuffer(packed, np.uint8)[:self.words * 8]
+        column.view(np.uint8)[:len(packed)] = packed
+        return column & self.ones
+
+    # Same as IntColumns.repeat_rows, using a table of every byte with its bits doubled
+    def repeat_rows(self, column):
+        byte = np.arange(256, dtype="<u2")
+        doubled = np.zeros(256, "<u2")
+        for i in range(8):
+            doubled |= ((byte >> i) & 1) * np.uint16(3 << 2 * i)
+        return self.from_packed(doubled[column.view(np.uint8)].view(np.uint8))
+
+    def unpack(self, column) -> list[int]:
+        return np.unpackbits(column.view(np.uint8), count=self.rows, bitorder="little").tolist()
+
+
+BACKENDS = {"int": IntColumns, "numpy": NumpyColumns}
+
+
+# Expands rows [start, stop) of a packed column into a string of "0"s and "1"s, in row order
+def packed_bits(packed, start: int, stop: int) -> str:
+    chunk = int.from_bytes(packed[start // 8:-(-stop // 8)], "little") >> (start % 8)
+    return format(chunk & ((1 << (stop - start)) - 1), f"0{stop - start}b")[::-1]
+
+
+class Dag:
+    # The operator of each opcode
+    OPS = ("s", "0", "1", "!!", "&&", "||", "++", "!&", "!|", "!+")
+    CODES = {op: code for code, op in enumerate(OPS)}
+
+    def __init__(self):
+        """
+        Every distinct subexpression of every entry is a node, numbered in the order it was made. Rather than an
+        object per node, the nodes are columns of three arrays: self.ops holds the opcode of each node, and
+        self.first and self.second its operands, or -1 if it has fewer. Operands are indices of other nodes, except
+        for a statement node, whose operand is the statement's index, so each statement's name is only stored once,
+        by the table. A node's operands always come before it, so the nodes are in evaluation order
+        
+        s  -> Statement
+        0  -> False
+        1  -> True
+        !! -> Not, with one operand
+        && -> Any binary operator, with two operands
+        
+        dag[i] reads node i back as a tuple of its operator and operands, like ("&&", 3, 5)
+        """
+        self.ops = array.array("B")
+        self.first = array.array("q")
+        self.second = array.array("q")
+        self.index: dict[int, int] = {}  # the key of each node -> the node
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __getitem__(self, i: int) -> tuple:
+        op = self.OPS[self.ops[i]]
+        if op == "0" or op == "1":
+            return op,
+        elif op == "s" or op == "!!":
+            return op, self.first[i]
+        return op, self.first[i], self.second[i]
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self.ops)))
+
+    # Hash-consing: building a node that already exists gives back the existing one. Every binary operator is
+    # commutative, so the operands are sorted first, making "a&&b" and "b&&a" the same node. Each node's key packs
+    # its opcode and operands into a single int
+    def node(self, op: str, first=-1, second=-1) -> int:
+        if first > second >= 0:
+            first, second = second, first
+        code = self.CODES[op]
+        key = (first + 1) << 40 | (second + 1) << 4 | code
+        if key not in self.index:
+            self.index[key] = len(self.ops)
+            self.ops.append(code)
+            self.first.append(first)
+            self.second.append(second)
+        return self.index[key]
+
+    def copy(self):
+        dag = Dag()
+        dag.ops, dag.first, dag.second = self.ops[:], self.first[:], self.second[:]
+        dag.index = dict(self.index)
+        return dag
+
+
+class Stats:
+    def __init__(self, enabled=False, callback=None, memory=True):
+        """
+        Instrumentation for each stage a table goes through, like parsing, compiling, or interpreting. Every stage
+        gets a record of its name, wall time in seconds, and peak memory growth in bytes, plus any counts the stage
+        adds, like rows, columns, or intermediate columns. Records are kept in self.records and passed to the callback
+        as soon as their stage finishes, e.g. to forward them to a metrics pipeline.
+        
+        When disabled, a stage costs a single check, and memory is only traced while a stage is running and memory
+        is set, since tracemalloc slows everything down while it runs
+        """
+        self.enabled = enabled or callback is not None
+        self.callback = callback
+        self.memory = memory
+        self.records: list[dict] = []
+        self.running: list[dict] = []  # nested stages, innermost last
+        self.tracing = False
+
+    # Measures the body of a with statement as a stage, giving a record that counts can be added to
+    def stage(self, name: str):
+        if not self.enabled:
+            return contextlib.nullcontext({})
+        return self.measure(name)
+
+    @contextlib.contextmanager
+    def measure(self, name: str):
+        record = {"stage": name}
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.tracing = True
+            # A nested stage resets the peak, so the stage around it keeps its own peak so far
+            current, peak = tracemalloc.get_traced_memory()
+            if self.running:
+                self.running[-1]["peak"] = max(self.running[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            self.running.append({"start": current, "peak": current})
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            if self.memory:
+                running = self.running.pop()
+                peak = max(running["peak"], tracemalloc.get_traced_memory()[1])
+                record["peak_bytes"] = peak - running["start"]
+                if self.running:
+                    self.running[-1]["peak"] = max(self.running[-1]["peak"], peak)
+                elif self.tracing:
+                    tracemalloc.stop()
+                    self.tracing = False
+            self.records.append(record)
+            if self.callback:
+                self.callback(record)
 
 
 class Table:
-    def __init__(self, inp: str):
+    # simplify runs the Simplifier on the parsed entries. drop_unused also removes statements that the
+    # entries no longer depend on, e.g. q in "p || (q && 0)", which halves the table for each one removed.
+    # fixed maps statements to a value of 0 or 1 that they are replaced by, so they are left out of the table too.
+    # A FormulaCache skips parsing and compiling entries that were already seen
+    def __init__(self, inp: str, backend="int", stats=None, simplify=True, drop_unused=False, cache=None,
+                 fixed=None):
         # Constants
         self.WHITESPACE = " \t"
         self.OPS = "&|+!"
         self.BIN = "01"
 
+        self.input = inp
         self.entries: list[str] = inp.split(";")
         self.map_entries = {}
-        self.ast: list[list[list[list[str]]]] = []
+        self.dag = Dag()
+        self.ast: list[int] = []  # The root node of each entry in self.dag
         self.statements: list[str] = []
+        self.statement_index: dict[str, int] = {}
         self.map_statements = {}
         self.size = 0
         self.result = "\n"
 
+        # The NumPy backend is optional, so fall back to pure Python ints without it
+        self.backend = "int" if backend == "numpy" and np is None else backend
+        self.columns = None
+        self.program = None
+
+        self.stats: Stats = Stats() if stats is None else stats
+        self.simplify = simplify
+        self.drop_unused = drop_unused
+        self.fixed: dict[str, int] = dict(fixed or {})
+        self.cache = cache
+        self.cache_key = None  # set by the cache while parsing
+
     def __str__(self):
         return self.result
 
@@ -23,77 +304,220 @@ class Table:
     def set_size(self):
         self.size = 2**len(self.statements)
 
-    def remove_character(self, entry: int, pointer: int):
-        # If at the beginning
-        if pointer == 0:
-            self.entries[entry] = self.entries[entry][1:]
-
-        # If at the end
-        elif pointer == len(self.entries[entry])-1:
-            self.entries[entry] = self.entries[entry][:-1]
-
-        # If somewhere in the middle
-        else:
-            self.entries[entry] = self.entries[entry][:pointer] + self.entries[entry][pointer + 1:]
-
     def remove_whitespace(self):
-        ptr = 0
+        table = str.maketrans("", "", self.WHITESPACE)
         for i in range(len(self.entries)):
-            while self.WHITESPACE[0] in self.entries[i] or self.WHITESPACE[1] in self.entries[i]:
-                if self.entries[i][ptr] in self.WHITESPACE:
-                    self.remove_character(i, ptr)
-                else:
-                    ptr += 1
-            ptr = 0
+            self.entries[i] = self.entries[i].translate(table)
 
-    # A complicated, yet compact and efficient, algorithm for populating all the combinations
     def populate_statements(self):
-        it = iter(self.statements)
-        for n in [2**i for i in range(len(self.statements))]:
-            self.map_statements[next(it)] = [math.floor(j * n * 2 / self.size) for j in range(int(self.size / n))] * n
+        with self.stats.stage("populate_statements") as record:
+            self.columns = BACKENDS[self.backend](self.size)
+            for i in range(len(self.statements)):
+                self.map_statements[self.statements[i]] = self.columns.statement(i)
+            record.update(rows=self.size, columns=len(self.statements))
 
     # This uses the table entries, statements, and their respective maps to create the table
     def generate(self):
+        self.result += self.header() + "".join(self.iter_rows())
+
+    # Streams the whole table to a file-like object, joining chunk_rows rows per write so memory stays bounded.
+    # With more than one worker, the table doesn't need to be populated or interpreted. Instead, each chunk of rows
+    # is evaluated and rendered by a pool of worker processes, and written in order as soon as it is ready
+    def write_to(self, fp, chunk_rows=4096, workers=1):
+        if workers < 1:
+            raise ValueError("there must be at least one worker")
+        with self.stats.stage("write") as record:
+            fp.write(self.header())
+            if workers > 1:
+                chunks = [(i, min(i + chunk_rows, self.size)) for i in range(0, self.size, chunk_rows)]
+                with multiprocessing.Pool(workers, start_worker,
+                                          (self.input, self.backend, self.simplify, self.drop_unused,
+                                           self.fixed)) as pool:
+                    for rows in pool.imap(render_range, chunks):
+                        fp.write(rows)
+            else:
+                rows = self.iter_rows(chunk_rows=chunk_rows)
+                for _ in range(0, self.size, chunk_rows):
+                    fp.write("".join(itertools.islice(rows, chunk_rows)))
+            record.update(rows=self.size, columns=len(self.statements) + len(self.entries), workers=workers)
+
+    # The top two rows of the table
+    def header(self) -> str:
         # Creates the top row with each column identifier
+        header = ""
         for i in self.statements:
-            self.result += f"| {i} "
-        self.result += "||"
+            header += f"| {i} "
+        header += "||"
         for i in self.entries:
-            self.result += f" {i} |"
-        self.result += "\n"
+            header += f" {i} |"
+        header += "\n"
 
         # Creates the dashed line separating the top identifiers with the bottom values
         for i in self.statements:
-            self.result += "|" + "-" * (len(i)+2)
-        self.result += "||"
+            header += "|" + "-" * (len(i)+2)
+        header += "||"
         for i in self.entries:
-            self.result += "-" * (len(i)+2) + "|"
-        self.result += "\n"
-
-        # Fills the table with 1s and 0s
-        for i in range(self.size):
-            for j in self.statements:
-                left = " " * (1 + math.floor(len(j) / 2))
-                right = " " * math.ceil(len(j) / 2)
-                self.result += f"|{left}{self.map_statements[j][i]}{right}"
-            self.result += "||"
-            for j in self.entries:
-                left = " " * (1 + math.floor(len(j) / 2))
-                right = " " * math.ceil(len(j) / 2)
-                self.result += f"{left}{self.map_entries[j][i]}{right}|"
-            self.result += "\n"
+            header += "-" * (len(i)+2) + "|"
+        return header + "\n"
+
+    # A %-format template for one row of 1s and 0s, so the padding of each cell is only computed once
+    def row_template(self) -> str:
+        template = ""
+        for j in self.statements:
+            template += "|" + " " * (1 + math.floor(len(j) / 2)) + "%s" + " " * math.ceil(len(j) / 2)
+        template += "||"
+        for j in self.entries:
+            template += " " * (1 + math.floor(len(j) / 2)) + "%s" + " " * math.ceil(len(j) / 2) + "|"
+        return template + "\n"
+
+    # Yields rows [start, stop) of the table one at a time
+    def iter_rows(self, start=0, stop=None, chunk_rows=4096):
+        packed = [self.columns.packed(self.map_statements[j]) for j in self.statements]
+        packed += [self.columns.packed(self.map_entries[j]) for j in self.entries]
+        return self.format_rows(packed, start, self.size if stop is None else stop, chunk_rows)
+
+    # Saves the statement and entry columns as packed bits, in the format read by TableFile. An interpreted table
+    # writes its columns as they are, otherwise the rows are evaluated chunk_rows at a time and each chunk
+    # is written straight into its place in every column
+    def save(self, path: str, chunk_rows=65536):
+        with self.stats.stage("save") as record:
+            self.write_file(path, chunk_rows)
+            record.update(rows=self.size, columns=len(self.statements) + len(self.entries))
+
+    def write_file(self, path: str, chunk_rows: int):
+        columns = len(self.statements) + len(self.entries)
+        column_bytes = -(-self.size // 64) * 8
+        header = json.dumps({"statements": self.statements, "entries": self.entries, "rows": self.size,
+                             "column_bytes": column_bytes}).encode()
+        data_start = -(-(len(TableFile.MAGIC) + 4 + len(header)) // 8) * 8
+
+        with open(path, "wb") as fp:
+            fp.write(TableFile.MAGIC + struct.pack("<I", len(header)) + header)
+            fp.truncate(data_start + columns * column_bytes)
+
+            if self.map_entries:
+                packed = [self.columns.packed(self.map_statements[i]) for i in self.statements]
+                packed += [self.columns.packed(self.map_entries[i]) for i in self.entries]
+                for i in range(columns):
+                    fp.seek(data_start + i * column_bytes)
+                    fp.write(packed[i])
+                return
+
+            chunk_rows = max(8, chunk_rows // 8 * 8)
+            for start in range(0, self.size, chunk_rows):
+                chunk, statements, entries = self.evaluate_range(start, min(start + chunk_rows, self.size))
+                for i, column in enumerate(statements + entries):
+                    fp.seek(data_start + i * column_bytes + start // 8)
+                    fp.write(chunk.packed(column)[:-(-chunk.rows // 8)])
+
+    """
+    The following three functions export the statement and entry columns, in that order, straight from their packed
+    form. The table is interpreted first if it hasn't been, and only NumPy or pandas ever touch individual rows
+    """
+    # Each column's name and its packed bits, where row i is bit i % 8 of byte i // 8. That is the same layout as an
+    # Arrow boolean buffer, so e.g. pyarrow.BooleanArray.from_buffers(pyarrow.bool_(), table.size, [None, buffer])
+    # wraps a column as it is. Columns of the NumPy backend are views of its arrays, so nothing is copied, but every
+    # buffer is read-only and cut to just the bytes holding rows, since the arrays are shared, e.g. the column of
+    # ones, which every negation uses
+    def to_buffers(self) -> list[tuple[str, memoryview]]:
+        if not self.map_entries:
+            Interpreter(self)
+        columns = [self.map_statements[i] for i in self.statements] + [self.map_entries[i] for i in self.entries]
+        names = self.statements + self.entries
+        column_bytes = -(-self.size // 8)
+        return [(name, memoryview(self.columns.packed(column))[:column_bytes].toreadonly())
+                for name, column in zip(names, columns)]
+
+    # A bool array with a row per row of the table and a column per statement then entry, or with packed, a uint8
+    # array with a row of packed bits per column, as in to_buffers
+    def to_numpy(self, packed=False):
+        if np is None:
+            raise ImportError("to_numpy needs NumPy")
+        buffers = self.to_buffers()
+        column_bytes = -(-self.size // 8)
+        if packed:
+            array = np.empty((len(buffers), column_bytes), np.uint8)
+            for i, (_, buffer) in enumerate(buffers):
+                array[i] = np.frombuffer(buffer, np.uint8, column_bytes)
+            return array
+
+        # Filled a column at a time, then transposed, which is only a view
+        array = np.empty((len(buffers), self.size), np.bool_)
+        for i, (_, buffer) in enumerate(buffers):
+            array[i] = np.unpackbits(np.frombuffer(buffer, np.uint8, column_bytes), count=self.size,
+                                     bitorder="little").view(np.bool_)
+        return array.T
+
+    # A DataFrame of bool columns named after the statements and entries. An entry that is just a statement, like
+    # "p", gives two columns of the same name. pandas is only imported here, since importing it is slow
+    def to_dataframe(self):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("to_dataframe needs pandas") from None
+        return pd.DataFrame(self.to_numpy(), columns=self.statements + self.entries, copy=False)
+
+    # Evaluates rows [start, stop) without the rest of the table, giving the columns they are stored in,
+    # then the statement columns and the entry columns of just those rows
+    def evaluate_range(self, start: int, stop: int):
+        if self.program is None:
+            Compiler(self)
+        columns = BACKENDS[self.backend](self.size, start, stop)
+        statements = [columns.statement(i) for i in range(len(self.statements))]
+        return columns, statements, self.program(statements, columns)
+
+    """
+    The following three functions evaluate only what they are asked for, without populating or interpreting the
+    whole table, so a handful of lookups stay cheap no matter how many statements there are
+    """
+    # Evaluates every entry for one assignment of a 0 or 1 to each statement, giving the entry values in order
+    def evaluate(self, assignment: dict[str, int]) -> list[int]:
+        if self.program is None:
+            Compiler(self)
+        if set(assignment) != set(self.statements):
+            raise ValueError("an assignment must give a value to every statement, and nothing else")
+        return self.program.evaluate([assignment[i] & 1 for i in self.statements])
+
+    # Gets the ith row of the table: the value of each statement, followed by the value of each entry
+    def row(self, i: int) -> list[int]:
+        if not 0 <= i < self.size:
+            raise IndexError("row index out of range")
+        count = len(self.statements)
+        values = [(i >> (count - 1 - j)) & 1 for j in range(count)]
+        return values + self.evaluate(dict(zip(self.statements, values)))
+
+    # Yields rows [start, stop) in the same form as row, evaluating chunk_rows of them at a time
+    def rows(self, start=0, stop=None, chunk_rows=4096):
+        stop = self.size if stop is None else min(stop, self.size)
+        for chunk_start in range(start, stop, chunk_rows):
+            columns, statements, entries = self.evaluate_range(chunk_start, min(chunk_start + chunk_rows, stop))
+            yield from (list(i) for i in zip(*[columns.unpack(j) for j in statements + entries]))
+
+    # Yields rows [start, stop) of packed statement and entry columns. The rows are expanded from the columns
+    # chunk_rows at a time, so only one chunk is ever held as text
+    def format_rows(self, packed: list, start: int, stop: int, chunk_rows=4096):
+        template = self.row_template()
+        for chunk_start in range(start, stop, chunk_rows):
+            chunk_stop = min(chunk_start + chunk_rows, stop)
+            for row in zip(*[packed_bits(i, chunk_start, chunk_stop) for i in packed]):
+                yield template % row
 
 
 class Parser:
+    # One match per token, so every entry is scanned exactly once. Anything that doesn't match
+    # one of the groups is a single unrecognized character
+    token_pattern = re.compile(r"(?P<S>[^\W\d_]+)|(?P<O>[&|+!]{1,2})|(?P<B>[01])|(?P<LP>\()|(?P<RP>\))"
+                               r"|(?P<W>[ \t]+)|(?P<X>.)", re.DOTALL)
+
+    # Only the entries are parsed. The statement columns are left for whatever evaluates the table to populate,
+    # if it needs them at all
     def __init__(self, table_input: Table):
         self.table = table_input
 
         self.entry = -1
         self.num_entries = len(self.table.entries)
-        self.scope = 0
-        self.eoe = 0  # end-of-entry
-        self.ptr = 0  # input pointer
-        self.ec = [0]  # expression count
+        self.depth = 0  # number of unclosed parentheses
+        self.ptr = 0  # start of the current token
 
         """
         self.grammar maps an input token to the options for what token it expects to come next
@@ -116,79 +540,97 @@ class Parser:
         self.previous: str = ""
         self.expected: list[str] = []
 
-        self.parse()
+        # Binary operators from loosest to tightest. Negation is tighter than all of them
+        self.precedence = {"++": 0, "||": 1, "&&": 2, "!+": 3, "!|": 4, "!&": 5}
+
+        # The operator stack and operand stack used to build the tree of the current entry
+        self.operators: list[str] = []
+        self.operands: list[int] = []
+
+        if self.table.cache is not None and self.table.cache.load(self.table):
+            self.table.set_size()
+            return
+
+        with self.table.stats.stage("parse") as record:
+            self.parse()
+            self.table.remove_whitespace()
+            record.update(entries=self.num_entries, statements=len(self.table.statements),
+                          nodes=len(self.table.dag))
+
+        if self.table.simplify or self.table.fixed:
+            Simplifier(self.table, self.table.drop_unused, self.table.fixed)
         self.table.set_size()
-        self.table.remove_whitespace()
-        self.table.populate_statements()
-
-    # Gets the current character in the current entry
-    def current(self) -> str:
-        return self.table.entries[self.entry][self.ptr]
-
-    # Gets the next character in the current entry, but returns an $error string if at the end of the entry
-    def next(self) -> str:
-        if self.ptr+1 < self.eoe:
-            return self.table.entries[self.entry][self.ptr + 1]
-        return "$error"
-
-    # Gets the current expression index at the current scope or shifted from the current scope
-    def expression(self, shift=0) -> int:
-        return self.ec[self.scope + shift]
-
-    # Gets a substring of the current entry
-    def inp_substring(self, start: int) -> str:
-        return self.table.entries[self.entry][start:self.ptr + 1]
-
-    # Prevents errors with indexing, and increments the scope
-    def increase_scope(self):
-        if self.scope+1 > len(self.table.ast[self.entry])-1:
-            self.table.ast[self.entry].append([[]])
-            self.ec.append(0)
-        self.scope += 1
-
-    # Again, this prevents indexing errors
-    def ensure_sufficient_ec(self):
-        if self.expression()+1 > len(self.table.ast[self.entry][self.scope]):
-            self.table.ast[self.entry][self.scope].append([])
-
-    def append_to_parsed(self, expression: str, shift=0):
-        self.table.ast[self.entry][self.scope + shift][self.expression(shift)].append(expression)
-
-    # Logs a reference to an expression at a higher scope
-    def log_reference(self):
-        expression_reference = f"${self.scope}.{self.expression()}"
-        self.append_to_parsed(expression_reference, -1)
+
+    # Raises a SyntaxError at the current token, whose offset and text locate it in the entry
+    def error(self, message: str):
+        error = SyntaxError(message)
+        error.offset = self.ptr + 1
+        error.text = self.table.entries[self.entry]
+        raise error
+
+    # Splits the current entry into (token, text) pairs in a single pass, skipping whitespace
+    def tokens(self):
+        entry = self.table.entries[self.entry]
+        eoe = len(entry)  # end-of-entry
+        self.ptr = 0
+
+        while self.ptr < eoe:
+            match = self.token_pattern.match(entry, self.ptr)
+            token = match.lastgroup
+            text = match.group()
+
+            # The pattern can accept characters that are not strictly alphabetic, like "²"
+            if token == "S" and not text.isalpha():
+                text = text[:next(i for i, c in enumerate(text) if not c.isalpha())]
+                if not text:
+                    self.error("unrecognized symbol")
+
+            if token == "O":
+                if len(text) == 1:
+                    self.error("logical operators must consist of 2 symbols")
+                self.check_bad_operators(text)
+                token = "N" if text == "!!" else "O"
+            elif token == "B":
+                token = "S"
+            elif token == "X":
+                self.error("unrecognized symbol")
+
+            if token != "W":
+                yield token, text
+            self.ptr += len(text)
 
     # A ")" cannot come before a "(" because it makes no sense
     def check_scope_overflow(self):
-        if self.scope < 1:
-            raise SyntaxError("scope cannot be negative, i.e. no \")\" before \"(\"")
+        if self.depth < 1:
+            self.error("scope cannot be negative, i.e. no \")\" before \"(\"")
 
     # Catching bad operators that can pass by the parser
-    def check_bad_operators(self, at):
-        if self.inp_substring(at) in ["&!", "&|", "&+", "|!", "|&", "|+", "+!", "+&", "+|"]:
-            raise SyntaxError("invalid operator")
+    def check_bad_operators(self, operator: str):
+        if operator in ["&!", "&|", "&+", "|!", "|&", "|+", "+!", "+&", "+|"]:
+            self.error("invalid operator")
 
     # All error handling based on expected tokens becoming unmet
     def handle_error(self, current):
         token_to_term = {"O": "operator", "N": "negation", "LP": "left parenthesis", "RP": "right parenthesis"}
 
         if self.previous in ["O", "N"] and current == "RP":
-            raise SyntaxError("cannot end an expression with " + token_to_term[self.previous])
+            self.error("cannot end an expression with " + token_to_term[self.previous])
         elif self.previous == "LP" and current == "RP":
-            raise SyntaxError("empty expression, i.e. \"()\"")
+            self.error("empty expression, i.e. \"()\"")
         elif self.previous == "LP" and current == "O":
-            raise SyntaxError("cannot begin an expression with an operator")
+            self.error("cannot begin an expression with an operator")
         elif self.previous in ["RP", "S"] and current in ["LP", "S", "N"]:
-            raise SyntaxError("must have an operator between expressions")
+            self.error("must have an operator between expressions")
         elif self.previous == "O" == current:
-            raise SyntaxError("cannot use consecutive operators")
+            self.error("cannot use consecutive operators")
         elif self.previous == "N" and current == "O":
-            raise SyntaxError("cannot negate operator")
+            self.error("cannot negate operator")
         elif self.previous == "B" and current in ["RP", "O"]:
-            raise SyntaxError("cannot begin entry with " + token_to_term[current])
+            self.error("cannot begin entry with " + token_to_term[current])
+        elif self.previous == "B" and current == "E":
+            self.error("empty entry")
         elif current == "E":
-            raise SyntaxError("cannot end entry with " + token_to_term[self.previous])
+            self.error("cannot end entry with " + token_to_term[self.previous])
 
     def check_expected(self, current: str):
         if current not in self.expected:
@@ -197,220 +639,1427 @@ class Parser:
             self.previous = current
             self.expected = self.grammar[current]
 
+    # Finished operands are negated right away by any "!!"s before them, since negation binds tightest
+    def push_operand(self, node: int):
+        while self.operators and self.operators[-1] == "!!":
+            self.operators.pop()
+            node = self.table.dag.node("!!", node)
+        self.operands.append(node)
+
+    # Combines the top two operands with the operator on top of the operator stack
+    def reduce(self):
+        right = self.operands.pop()
+        left = self.operands.pop()
+        self.operands.append(self.table.dag.node(self.operators.pop(), left, right))
+
+    # Reduces every operator on the stack that binds at least as tightly as the given one, so that operators of
+    # equal priority are evaluated left to right
+    def reduce_while_tighter(self, operator: str):
+        while self.operators and self.operators[-1] in self.precedence \
+                and self.precedence[self.operators[-1]] >= self.precedence[operator]:
+            self.reduce()
+
+    # Builds the tree of each entry with the shunting-yard algorithm, in one pass over its tokens
     def parse(self):
         while self.entry+1 < self.num_entries:
             self.entry += 1
-            self.table.ast.append([[[]]])
-            self.eoe = len(self.table.entries[self.entry])
-            self.ptr = 0
-            self.scope = 0
-            self.ec = [0]
+            self.depth = 0
             self.previous = "B"
             self.expected = self.grammar[self.previous]
+            self.operators = []
+            self.operands = []
 
-            while self.ptr < self.eoe:
-                if self.current() == "(":
+            for token, text in self.tokens():
+                if token == "LP":
                     self.check_expected("LP")
-                    self.increase_scope()
-                    self.log_reference()
-                elif self.current() == ")":
+                    self.depth += 1
+                    self.operators.append("(")
+                elif token == "RP":
                     self.check_expected("RP")
                     self.check_scope_overflow()
-                    self.ec[self.scope] += 1
-                    self.scope -= 1
-                elif self.current().isalpha():
+                    self.depth -= 1
+                    while self.operators[-1] != "(":
+                        self.reduce()
+                    self.operators.pop()
+                    self.push_operand(self.operands.pop())
+                elif token == "S":
                     self.check_expected("S")
-                    start = self.ptr
-                    while self.next().isalpha():
-                        self.ptr += 1
-                    if self.inp_substring(start) not in self.table.statements:
-                        self.table.map_statements[self.inp_substring(start)] = []
-                        self.table.statements.append(self.inp_substring(start))
-                    self.ensure_sufficient_ec()
-                    self.append_to_parsed(self.inp_substring(start))
-                elif self.current() in self.table.OPS:
-                    if self.next() in self.table.OPS:
-                        self.ptr += 1
-                        self.check_bad_operators(self.ptr-1)
-                        if self.inp_substring(self.ptr-1) == "!!":
-                            self.check_expected("N")
-                        else:
-                            self.check_expected("O")
-                        self.ensure_sufficient_ec()
-                        self.append_to_parsed(self.inp_substring(self.ptr-1))
+                    if text in self.table.BIN:
+                        self.push_operand(self.table.dag.node(text))
                     else:
-                        raise SyntaxError("logical operators must consist of 2 symbols")
-                elif self.current() in self.table.BIN:
-                    self.check_expected("S")
-                    self.ensure_sufficient_ec()
-                    self.append_to_parsed(self.current())
-                elif self.current() in self.table.WHITESPACE:
-                    while self.next() in self.table.WHITESPACE:
-                        self.ptr += 1
+                        if text not in self.table.statement_index:
+                            self.table.statement_index[text] = len(self.table.statements)
+                            self.table.statements.append(text)
+                        self.push_operand(self.table.dag.node("s", self.table.statement_index[text]))
+                elif token == "N":
+                    self.check_expected("N")
+                    self.operators.append(text)
                 else:
-                    raise SyntaxError("unrecognized symbol")
-                self.ptr += 1
+                    self.check_expected("O")
+                    self.reduce_while_tighter(text)
+                    self.operators.append(text)
 
             self.check_expected("E")
-            if self.scope != 0:
-                raise SyntaxError("need closing parenthesis \")\"")
-
-
-class Interpreter:
-    def __init__(self, table_input: Table):
-        self.table = table_input
-
-        self.priority = ["!&", "!|", "!+", "&&", "||", "++"]
-        self.priority_ptr = 0
-        self.expr_ptr = 0
-
-        self.stack: list[list[int]] = []
-        self.memory = {}
-        self.memory_ptr = -1
+            if self.depth != 0:
+                self.error("need closing parenthesis \")\"")
 
-        self.interpret()
-        self.push_entries_to_map()
+            while self.operators:
+                self.reduce()
+            self.table.ast.append(self.operands.pop())
 
-    def push_to_stack(self, entry, scope, expr, term):
-        value = self.table.ast[entry][scope][expr][term]
 
-        # Pulls references from higher scopes when applicable
-        if value[0] == "$":
-            t = value[1:].split(".")
-            value = self.table.ast[entry][int(t[0])][int(t[1])][0]
-            self.table.ast[entry][scope][expr][term] = value
+class Simplifier:
+    def __init__(self, table_input: Table, drop_unused=False, fixed=None):
+        self.table = table_input
 
-        # Evaluates the term given and appends to the stack accordingly
-        if value in self.table.statements:
-            self.stack.append(self.table.map_statements[value])
-        elif value[0] == "#":
-            self.stack.append(self.memory[value])
-        elif value == "0":
-            self.stack.append([0] * self.table.size)
-        elif value == "1":
-            self.stack.append([1] * self.table.size)
+        """
+        Rebuilds the table's dag bottom-up with every node simplified, before anything is evaluated:
+        
+        Constant folding     -> p&&0 = 0, p||0 = p, p++1 = !!p, !!1 = 0
+        Double negation      -> !!!!p = p
+        Idempotence          -> p&&p = p, p||p = p
+        Self-inverse         -> p++p = 0, p&&!!p = 0, p||!!p = 1, p++!!p = 1
+        Absorption           -> p&&(p||q) = p, p||(p&&q) = p
+        Negated operators    -> p!&q = !!(p&&q), and likewise for !| and !+, so they share nodes with their
+                                positive forms, and negations can cancel out
+        Xor negations        -> !!p++q = !!(p++q), which lifts negations out so they can cancel out too
+        
+        Operands are already sorted into canonical order by the dag itself. Only nodes still reachable from an
+        entry are kept, so the compiled program never computes a dead column. Fixed statements are replaced by 0
+        or 1 before anything else, then removed from the table's statements, which halves the table for each
+        """
+        self.dag = Dag()
+        self.false = self.dag.node("0")
+        self.true = self.dag.node("1")
+
+        self.fixed: dict[int, int] = {}  # statement index -> value
+        for statement, value in (fixed or {}).items():
+            if statement not in self.table.statement_index:
+                raise ValueError(f"\"{statement}\" is not a statement of the entries")
+            if value not in (0, 1):
+                raise ValueError(f"\"{statement}\" can only be fixed to 0 or 1")
+            self.fixed[self.table.statement_index[statement]] = value
+
+        with self.table.stats.stage("simplify") as record:
+            converted = []
+            for node in self.table.dag:
+                converted.append(self.simplify(node, converted))
+            self.compact([converted[i] for i in self.table.ast], drop_unused)
+            record.update(nodes_before=len(converted), nodes=len(self.table.dag),
+                          statements=len(self.table.statements))
+
+    def simplify(self, node: tuple, converted: list[int]) -> int:
+        if node[0] == "s":
+            if node[1] in self.fixed:
+                return self.true if self.fixed[node[1]] else self.false
+            return self.dag.node(*node)
+        elif node[0] in "01":
+            return self.true if node[0] == "1" else self.false
+        elif node[0] == "!!":
+            return self.negate(converted[node[1]])
+
+        a, b = converted[node[1]], converted[node[2]]
+        if node[0] in ["!&", "!|", "!+"]:
+            return self.negate(self.binary({"!&": "&&", "!|": "||", "!+": "++"}[node[0]], a, b))
+        return self.binary(node[0], a, b)
+
+    def negate(self, a: int) -> int:
+        if a == self.true:
+            return self.false
+        if a == self.false:
+            return self.true
+        if self.dag[a][0] == "!!":
+            return self.dag[a][1]
+        return self.dag.node("!!", a)
+
+    # Whether one node is the negation of the other
+    def complements(self, a: int, b: int) -> bool:
+        return self.dag[a] == ("!!", b) or self.dag[b] == ("!!", a)
+
+    # Whether b is an op node with a as one of its operands
+    def absorbs(self, op: str, a: int, b: int) -> bool:
+        return self.dag[b][0] == op and a in self.dag[b][1:]
+
+    def binary(self, op: str, a: int, b: int) -> int:
+        if op == "&&":
+            if self.false in (a, b) or self.complements(a, b):
+                return self.false
+            if a == self.true or a == b or self.absorbs("||", b, a):
+                return b
+            if b == self.true or self.absorbs("||", a, b):
+                return a
+        elif op == "||":
+            if self.true in (a, b) or self.complements(a, b):
+                return self.true
+            if a == self.false or a == b or self.absorbs("&&", b, a):
+                return b
+            if b == self.false or self.absorbs("&&", a, b):
+                return a
+        else:
+            if a == b:
+                return self.false
+            if self.complements(a, b):
+                return self.true
+            if a in (self.false, self.true):
+                return b if a == self.false else self.negate(b)
+            if b in (self.false, self.true):
+                return a if b == self.false else self.negate(a)
+            if self.dag[a][0] == "!!" or self.dag[b][0] == "!!":
+                negations = (self.dag[a][0] == "!!") + (self.dag[b][0] == "!!")
+                a = self.dag[a][1] if self.dag[a][0] == "!!" else a
+                b = self.dag[b][1] if self.dag[b][0] == "!!" else b
+                result = self.binary("++", a, b)
+                return self.negate(result) if negations == 1 else result
+        return self.dag.node(op, a, b)
+
+    # Replaces the table's dag with only the nodes reachable from its entries, renumbering them in the same order.
+    # With drop_unused, statements that no entry reaches anymore are removed from the table, too
+    def compact(self, roots: list[int], drop_unused: bool):
+        reachable = [False] * len(self.dag)
+        for i in roots:
+            reachable[i] = True
+        for i in range(len(self.dag) - 1, -1, -1):
+            if reachable[i] and self.dag[i][0] not in "s01":
+                for operand in self.dag[i][1:]:
+                    reachable[operand] = True
+
+        statements = [i for i in range(len(self.table.statements)) if i not in self.fixed]
+        if drop_unused:
+            used = {node[1] for i, node in enumerate(self.dag) if reachable[i] and node[0] == "s"}
+            statements = [i for i in statements if i in used]
+        renumbered_statement = {old: new for new, old in enumerate(statements)}
+
+        dag = Dag()
+        renumbered = {}
+        for i, node in enumerate(self.dag):
+            if not reachable[i]:
+                continue
+            if node[0] == "s":
+                renumbered[i] = dag.node("s", renumbered_statement[node[1]])
+            else:
+                renumbered[i] = dag.node(node[0], *[renumbered[j] for j in node[1:]])
+
+        self.table.dag = dag
+        self.table.ast = [renumbered[i] for i in roots]
+        self.table.statements = [self.table.statements[i] for i in statements]
+        self.table.statement_index = {statement: i for i, statement in enumerate(self.table.statements)}
+
+
+class Program:
+    """
+    Straight-line Python code that evaluates every entry at once, compiled a single time and then reused for any
+    columns: the whole table, a range of rows, or a single row. Running it never modifies the parsed entries
+    """
+    def __init__(self, source: str, temporaries=0, code=None):
+        self.source = source
+        self.temporaries = temporaries  # the number of intermediate columns computed per run
+        self.code = compile(source, "<truth table>", "exec") if code is None else code
+        namespace = {}
+        exec(self.code, namespace)
+        self.run = namespace["run"]
 
-    def flush_stack(self):
-        self.stack = []
+    # Evaluates every entry over the given statement columns, returning one column per entry
+    def __call__(self, statements: list, columns) -> list:
+        return self.run(statements, columns.ones, columns.zeros)
 
-    # Stack references look like "#1", "#27", etc.
-    def create_stack_reference(self) -> str:
-        self.memory_ptr += 1
-        return "#" + str(self.memory_ptr)
+    # Evaluates every entry for a single row, given the 0 or 1 value of each statement
+    def evaluate(self, values: list[int]) -> list[int]:
+        return self.run(values, 1, 0)
 
-    """
-    The following seven functions actually process the logical operations on values pushed to the stack
-    """
-    def not_of_stack(self, *args) -> list[int]:
-        if len(args) == 1:
-            return [1 - i for i in args[0]]
-        elif len(args) == 0:
-            return [1 - i for i in self.stack[0]]
 
-    def and_of_stack(self) -> list[int]:
-        return [self.stack[0][i] & self.stack[1][i] for i in range(self.table.size)]
+class Compiler:
+    def __init__(self, table_input: Table):
+        self.table = table_input
 
-    def or_of_stack(self) -> list[int]:
-        return [self.stack[0][i] | self.stack[1][i] for i in range(self.table.size)]
+        # The dag is shared by every entry, so a subexpression is only computed once no matter how many times it
+        # appears
+        self.dag = self.table.dag
+        self.roots = self.table.ast
+        self.temporaries = 0
+
+        with self.table.stats.stage("compile") as record:
+            self.table.program = Program(self.emit(), self.temporaries)
+            record.update(nodes=len(self.dag), intermediate_columns=self.temporaries)
+        if self.table.cache is not None:
+            self.table.cache.store(self.table)
+
+    # The index of the last node using each node, so its temporary can be freed right after
+    def last_uses(self) -> dict[int, int]:
+        last_use = {}
+        for i, node in enumerate(self.dag):
+            if node[0] != "s":
+                for operand in node[1:]:
+                    last_use[operand] = i
+        return last_use
+
+    # Nodes that are links of a longer chain of the same operator, like a&&b in a&&b&&c. Only &&, ||, and ++ chain,
+    # and only if nothing else uses the link, so its column can be updated in place by the rest of the chain
+    def chain_links(self) -> set[int]:
+        uses = collections.Counter(self.roots)
+        for node in self.dag:
+            if node[0] != "s":
+                uses.update(node[1:])
+
+        links = set()
+        for node in self.dag:
+            if node[0] in ("&&", "||", "++"):
+                links.update(j for j in node[1:] if self.dag[j][0] == node[0] and uses[j] == 1)
+        return links
+
+    # Writes the source of the run(s, ones, zeros) function, with one line per operator node. Statements are
+    # read from s, and every operator node is stored in a temporary t<node>, which is deleted once nothing else
+    # needs it. Only the entry results are kept until the end.
+    # A chain like a&&b&&c&&d is folded into the temporary of its first link instead: "t = a & b", then "t &= c"
+    # and "t &= d", so there is one temporary for the whole chain, which NumPy columns update without copying
+    def emit(self) -> str:
+        names = []
+        lines = ["def run(s, ones, zeros):"]
+        ops = {"&&": "{} & {}", "||": "{} | {}", "++": "{} ^ {}",
+               "!&": "({} & {}) ^ ones", "!|": "({} | {}) ^ ones", "!+": "({} ^ {}) ^ ones"}
+        in_place = {"&&": "{} &= {}", "||": "{} |= {}", "++": "{} ^= {}"}
+        last_use = self.last_uses()
+        links = self.chain_links()
+        roots = set(self.roots)
+
+        for i, node in enumerate(self.dag):
+            if node[0] == "s":
+                names.append(f"s[{node[1]}]")
+            elif node[0] == "0":
+                names.append("zeros")
+            elif node[0] == "1":
+                names.append("ones")
+            else:
+                chained = [j for j in node[1:] if j in links]
+                if chained:
+                    names.append(names[chained[0]])
+                    for j in chained[1:] + [j for j in node[1:] if j not in links]:
+                        lines.append("    " + in_place[node[0]].format(names[i], names[j]))
+                else:
+                    names.append(f"t{i}")
+                    self.temporaries += 1
+                    if node[0] == "!!":
+                        lines.append(f"    t{i} = {names[node[1]]} ^ ones")
+                    else:
+                        lines.append(f"    t{i} = " + ops[node[0]].format(names[node[1]], names[node[2]]))
 
-    def xor_of_stack(self) -> list[int]:
-        return [self.stack[0][i] ^ self.stack[1][i] for i in range(self.table.size)]
+                freed = [names[j] for j in sorted(set(node[1:])) if last_use[j] == i and j not in roots]
+                freed = [name for name in freed if name[0] == "t" and name != names[i]]
+                if freed:
+                    lines.append("    del " + ", ".join(freed))
 
-    def not_and_of_stack(self) -> list[int]:
-        return self.not_of_stack(self.and_of_stack())
+        lines.append("    return [" + ", ".join(names[i] for i in self.roots) + "]")
+        return "\n".join(lines) + "\n"
 
-    def not_or_of_stack(self) -> list[int]:
-        return self.not_of_stack(self.or_of_stack())
 
-    def not_xor_of_stack(self) -> list[int]:
-        return self.not_of_stack(self.xor_of_stack())
+class Interpreter:
+    def __init__(self, table_input: Table):
+        self.table = table_input
 
-    # Negation operations involve one operand, instead of two, so it is treated separately
-    def push_not_of(self, entry, scope, expr):
-        reference = self.create_stack_reference()
-        self.push_to_stack(entry, scope, expr, self.expr_ptr+1)
+        # Entries are only compiled once, no matter how many times they are interpreted
+        if self.table.program is None:
+            Compiler(self.table)
+        if self.table.columns is None:
+            self.table.populate_statements()
 
-        self.memory[reference] = self.not_of_stack()
+        self.results = []
+        cached = None if self.table.cache is None else self.table.cache.results(self.table)
 
-        self.flush_stack()
-        self.table.ast[entry][scope][expr].pop(self.expr_ptr+1)
+        with self.table.stats.stage("interpret") as record:
+            if cached is None:
+                self.interpret()
+            else:
+                self.results = [self.table.columns.from_packed(i) for i in cached]
+            self.push_entries_to_map()
+            record.update(rows=self.table.size, columns=len(self.results),
+                          intermediate_columns=self.table.program.temporaries, cached=cached is not None)
 
-        self.table.ast[entry][scope][expr][self.expr_ptr] = reference
+        if cached is None and self.table.cache is not None:
+            self.table.cache.store(self.table, self.results)
 
-    # Operations between two operands executed here. The expression pointer points to the operator,
-    # so the operands are the -1 and +1 shifts
-    def push_operation_of(self, entry, scope, expr):
-        reference = self.create_stack_reference()
-        self.push_to_stack(entry, scope, expr, self.expr_ptr-1)
-        self.push_to_stack(entry, scope, expr, self.expr_ptr+1)
+    def interpret(self):
+        statements = [self.table.map_statements[i] for i in self.table.statements]
+        self.results = self.table.program(statements, self.table.columns)
 
-        if self.table.ast[entry][scope][expr][self.expr_ptr] == "!&":
-            self.memory[reference] = self.not_and_of_stack()
-        elif self.table.ast[entry][scope][expr][self.expr_ptr] == "!|":
-            self.memory[reference] = self.not_or_of_stack()
-        elif self.table.ast[entry][scope][expr][self.expr_ptr] == "!+":
-            self.memory[reference] = self.not_xor_of_stack()
-        elif self.table.ast[entry][scope][expr][self.expr_ptr] == "&&":
-            self.memory[reference] = self.and_of_stack()
-        elif self.table.ast[entry][scope][expr][self.expr_ptr] == "||":
-            self.memory[reference] = self.or_of_stack()
-        elif self.table.ast[entry][scope][expr][self.expr_ptr] == "++":
-            self.memory[reference] = self.xor_of_stack()
+    # The penultimate population of the map_entries dictionary
+    def push_entries_to_map(self):
+        for entry, result in zip(self.table.entries, self.results):
+            self.table.map_entries[entry] = result
 
-        self.flush_stack()
-        self.table.ast[entry][scope][expr].pop(self.expr_ptr+1)
-        self.table.ast[entry][scope][expr].pop(self.expr_ptr)
 
-        self.table.ast[entry][scope][expr][self.expr_ptr-1] = reference
+class Session:
+    """
+    A table that changes one entry at a time. Every entry is parsed and compiled on its own, and its column is kept,
+    so adding or editing an entry only evaluates that entry.
+    
+    A new statement goes after the others, which repeats every row of the table, so the columns already evaluated
+    are expanded with repeat_rows instead of being evaluated again. Once no entry uses a statement, it is removed,
+    and every entry is evaluated again over the smaller table, though none are parsed or compiled again
+    """
+    def __init__(self, backend="int", stats=None, simplify=True, cache=None, drop_unused=False, fixed=None):
+        self.backend = "int" if backend == "numpy" and np is None else backend
+        self.stats: Stats = Stats() if stats is None else stats
+        self.simplify = simplify
+        self.cache = cache
+        self.drop_unused = drop_unused
+        self.fixed: dict[str, int] = dict(fixed or {})  # applied to each entry that has the statement
 
-    # The zeroth scope might have no operators, like in "0" or "p" or "(f&&g)", which can cause errors
-    # since the entry result comes from the ast[entry][0][0][0] string and expects it in memory reference form "#5".
-    # This function forces it into the correct form.
-    def push_unhandled_statement(self, entry):
-        if self.table.ast[entry][0][0][0][0] != "#":
-            reference = self.create_stack_reference()
-            self.push_to_stack(entry, 0, 0, 0)
+        self.statements: list[str] = []
+        self.statement_index: dict[str, int] = {}
+        self.columns = BACKENDS[self.backend](1)
+        self.statement_columns = []
+        self.entries: list[str] = []
+        self.parsed: list[Table] = []  # each entry as a table of its own, holding its program
+        self.results = []  # the column of each entry
+
+    # Adds one or more entries separated by ";" after the others
+    def add(self, inp: str):
+        self.insert(len(self.entries), len(self.entries), self.parse(inp))
+
+    def remove(self, i: int):
+        self.check_index(i)
+        self.insert(i, i + 1, [])
+
+    # Replaces the ith entry with one or more entries separated by ";"
+    def edit(self, i: int, inp: str):
+        self.check_index(i)
+        self.insert(i, i + 1, self.parse(inp))
+
+    def check_index(self, i: int):
+        if not 0 <= i < len(self.entries):
+            raise IndexError("entry index out of range")
+
+    # Parses and compiles each entry before anything changes, so an invalid entry leaves the session as it was
+    def parse(self, inp: str) -> list[Table]:
+        parsed = []
+        for entry in inp.split(";"):
+            statements = {i.group() for i in Parser.token_pattern.finditer(entry) if i.lastgroup == "S"}
+            fixed = {i: value for i, value in self.fixed.items() if i in statements}
+            table = Table(entry, self.backend, self.stats, self.simplify, self.drop_unused, self.cache, fixed)
+            Parser(table)
+            if table.program is None:
+                Compiler(table)
+            parsed.append(table)
+        return parsed
+
+    # Replaces entries [start, stop) with the parsed ones, evaluating only those
+    def insert(self, start: int, stop: int, parsed: list[Table]):
+        self.add_statements(parsed)
+        with self.stats.stage("interpret") as record:
+            self.entries[start:stop] = [i.entries[0] for i in parsed]
+            self.parsed[start:stop] = parsed
+            self.results[start:stop] = [self.evaluate(i) for i in parsed]
+            record.update(rows=self.columns.size, columns=len(parsed))
+        self.remove_statements()
+
+    def evaluate(self, table: Table):
+        statements = [self.statement_columns[self.statement_index[i]] for i in table.statements]
+        return table.program(statements, self.columns)[0]
+
+    def add_statements(self, parsed: list[Table]):
+        statements = dict.fromkeys(i for table in parsed for i in table.statements)
+        new = [i for i in statements if i not in self.statement_index]
+        if not new:
+            return
+        for statement in new:
+            self.statement_index[statement] = len(self.statements)
+            self.statements.append(statement)
+            self.columns = BACKENDS[self.backend](2 * self.columns.size)
+            self.results = [self.columns.repeat_rows(i) for i in self.results]
+        self.statement_columns = [self.columns.statement(i) for i in range(len(self.statements))]
+
+    def remove_statements(self):
+        used = {i for table in self.parsed for i in table.statements}
+        if used.issuperset(self.statements):
+            return
+        self.statements = [i for i in self.statements if i in used]
+        self.statement_index = {statement: i for i, statement in enumerate(self.statements)}
+        self.columns = BACKENDS[self.backend](2**len(self.statements))
+        self.statement_columns = [self.columns.statement(i) for i in range(len(self.statements))]
+        with self.stats.stage("interpret") as record:
+            self.results = [self.evaluate(i) for i in self.parsed]
+            record.update(rows=self.columns.size, columns=len(self.parsed))
+
+    # A Table holding the session's columns, to print or save. It has no program, so it can't evaluate anything
+    def table(self) -> Table:
+        table = Table(";".join(self.entries), self.backend, self.stats)
+        table.entries = list(self.entries)
+        table.statements = list(self.statements)
+        table.statement_index = dict(self.statement_index)
+        table.size = self.columns.size
+        table.columns = self.columns
+        table.map_statements = dict(zip(self.statements, self.statement_columns))
+        table.map_entries = dict(zip(self.entries, self.results))
+        return table
+
+
+class Query:
+    """
+    The rows of a table that match a condition, found without evaluating every row. The condition is any
+    combination of a where clause, which is entries separated by ";" that must all be true, only_true, which
+    requires every entry of the table to be true, and diff, a pair of entries, by number from 1 or by text, that
+    must differ.
+    
+    Statement 0 toggles slowest, so giving values to the first few statements leaves a block of consecutive rows.
+    The condition is evaluated over those values with 0, 1, or None for unknown, and a block is skipped as soon as
+    the condition is 0, or all of it matches as soon as it is 1. Blocks of up to block_rows rows that are still
+    unknown are evaluated like Table.evaluate_range, with the condition as one more column to select rows by
+    """
+    def __init__(self, table_input: Table, where=None, only_true=False, diff=None, block_rows=4096):
+        self.table = table_input
+        self.block_rows = block_rows
+        self.pruned = 0  # rows skipped without evaluating them
+
+        # A copy of the table with the condition as one more root, so the table itself is left as it was
+        self.query = Table(self.table.input, self.table.backend, self.table.stats)
+        self.query.entries = self.table.entries
+        self.query.statements = self.table.statements
+        self.query.statement_index = self.table.statement_index
+        self.query.size = self.table.size
+        self.query.dag = self.dag = self.table.dag.copy()
+
+        conditions = []
+        if where is not None:
+            conditions += self.parse_where(where)
+        if only_true:
+            conditions += self.table.ast
+        if diff is not None:
+            conditions.append(self.dag.node("++", *[self.table.ast[self.entry_index(i)] for i in diff]))
+        self.condition = conditions[0] if conditions else self.dag.node("1")
+        for i in conditions[1:]:
+            self.condition = self.dag.node("&&", self.condition, i)
+
+        self.query.ast = self.table.ast + [self.condition]
+        Compiler(self.query)
+        self.nodes = [(i, self.dag[i]) for i in self.reachable()]
+
+    # Parses a where clause into the table's statements, giving the root of each of its entries
+    def parse_where(self, where: str) -> list[int]:
+        clause = Table(where, simplify=self.table.simplify)
+        Parser(clause)
+        for statement in clause.statements:
+            if statement not in self.table.statement_index and statement not in self.table.fixed:
+                raise ValueError(f"\"{statement}\" is not a statement of the table")
+
+        converted = []
+        for node in clause.dag:
+            if node[0] == "s" and clause.statements[node[1]] in self.table.fixed:
+                converted.append(self.dag.node(str(self.table.fixed[clause.statements[node[1]]])))
+            elif node[0] == "s":
+                converted.append(self.dag.node("s", self.table.statement_index[clause.statements[node[1]]]))
+            else:
+                converted.append(self.dag.node(node[0], *[converted[i] for i in node[1:]]))
+        return [converted[i] for i in clause.ast]
+
+    def entry_index(self, entry) -> int:
+        if isinstance(entry, int) or entry.strip().isdigit():
+            if not 1 <= int(entry) <= len(self.table.entries):
+                raise ValueError(f"there is no entry {entry}")
+            return int(entry) - 1
+        entry = entry.translate(str.maketrans("", "", self.table.WHITESPACE))
+        if entry not in self.table.entries:
+            raise ValueError(f"\"{entry}\" is not an entry of the table")
+        return self.table.entries.index(entry)
+
+    # The nodes the condition depends on, in evaluation order
+    def reachable(self) -> list[int]:
+        reachable = {self.condition}
+        for i in range(self.condition, -1, -1):
+            if i in reachable and self.dag[i][0] not in "s01":
+                reachable.update(self.dag[i][1:])
+        return sorted(reachable)
+
+    # The condition's value when the first depth statements are the bits of prefix, or None if it depends on the rest
+    def decide(self, prefix: int, depth: int):
+        values = {}
+        for i, node in self.nodes:
+            op = node[0]
+            if op == "s":
+                value = (prefix >> (depth - 1 - node[1])) & 1 if node[1] < depth else None
+            elif op == "0" or op == "1":
+                value = int(op)
+            elif op == "!!":
+                value = None if values[node[1]] is None else 1 - values[node[1]]
+            else:
+                a, b = values[node[1]], values[node[2]]
+                if op[1] == "&":
+                    value = 0 if a == 0 or b == 0 else None if a is None or b is None else 1
+                elif op[1] == "|":
+                    value = 1 if a == 1 or b == 1 else None if a is None or b is None else 0
+                else:
+                    value = None if a is None or b is None else a ^ b
+                if op[0] == "!" and value is not None:
+                    value = 1 - value
+            values[i] = value
+        return values[self.condition]
+
+    # Yields (start, stop, matches) for each block of rows that may match, where matches is True if every row does
+    def blocks(self, prefix=0, depth=0):
+        remaining = len(self.table.statements) - depth
+        start, stop = prefix << remaining, (prefix + 1) << remaining
+        value = self.decide(prefix, depth)
+        if value == 0:
+            self.pruned += stop - start
+        elif value == 1 or stop - start <= self.block_rows or remaining == 0:
+            yield start, stop, value == 1
+        else:
+            yield from self.blocks(2 * prefix, depth + 1)
+            yield from self.blocks(2 * prefix + 1, depth + 1)
+
+    # Yields the matching rows as tuples of "0"s and "1"s, one per statement and then one per entry
+    def matches(self, chunk_rows=4096):
+        for start, stop, matches in self.blocks():
+            for chunk_start in range(start, stop, chunk_rows):
+                chunk_stop = min(chunk_start + chunk_rows, stop)
+                columns, statements, results = self.query.evaluate_range(chunk_start, chunk_stop)
+                bits = [packed_bits(columns.packed(i), 0, columns.rows) for i in statements + results]
+                if matches:
+                    yield from zip(*bits[:-1])
+                else:
+                    yield from (row[:-1] for row in zip(*bits) if row[-1] == "1")
+
+    # Yields the matching rows in the same form as Table.rows
+    def rows(self, chunk_rows=4096):
+        return ([int(i) for i in row] for row in self.matches(chunk_rows))
+
+    # Writes the table's header and the matching rows, laid out the same as Table.write_to, chunk_rows rows per write
+    def write_to(self, fp, chunk_rows=4096):
+        with self.table.stats.stage("query") as record:
+            template = self.table.row_template()
+            fp.write(self.table.header())
+            count = 0
+            matches = self.matches(chunk_rows)
+            while chunk := [template % row for row in itertools.islice(matches, chunk_rows)]:
+                fp.write("".join(chunk))
+                count += len(chunk)
+            record.update(rows=count, pruned_rows=self.pruned)
+
+
+class BDD:
+    def __init__(self, table_input: Table, order="appearance"):
+        self.table = table_input
 
-            self.memory[reference] = self.stack[0]
+        """
+        A reduced ordered binary decision diagram of every entry, which answers questions about an entry without
+        enumerating the rows of the table, so it only needs the entries to be parsed.
+        
+        self.nodes holds (level, low, high) triples, where level is the position of the node's statement in
+        self.order, and low and high are the nodes for when that statement is 0 and 1. Nodes 0 and 1 are false and
+        true, at the level below every statement. No two nodes are the same, thanks to self.unique, and a node's
+        children always come before it
+        
+        order may be one of the heuristics in self.heuristics, or a list of every statement from the top level down
+        """
+        self.heuristics = {"appearance": self.appearance_order, "reverse": self.reverse_order,
+                           "frequency": self.frequency_order, "depth": self.depth_order}
+        self.order: list[int] = self.heuristics[order]() if isinstance(order, str) \
+            else [self.table.statement_index[i] for i in order]
+        if sorted(self.order) != list(range(len(self.table.statements))):
+            raise ValueError("the variable order must contain every statement exactly once")
 
-            self.flush_stack()
+        self.levels = len(self.order)
+        self.level = {statement: level for level, statement in enumerate(self.order)}
+        self.nodes: list[tuple] = [(self.levels, 0, 0), (self.levels, 1, 1)]
+        self.unique: dict[tuple, int] = {}
 
-            self.table.ast[entry][0][0][0] = reference
+        # Results of earlier operations, keyed by operator and operands
+        self.cache: dict[tuple, int] = {}
+        self.cache_hits = 0
 
-    def interpret(self):
-        # Iterates through the ith entry
-        for i in range(len(self.table.ast)):
-            # Iterates through the jth scope in reverse order
-            for j in range(len(self.table.ast[i])-1, -1, -1):
-                # Iterates through the kth expression
-                for k in range(len(self.table.ast[i][j])):
-                    self.expr_ptr = 0
-                    self.priority_ptr = 0
-
-                    # Handles negations separately
-                    while "!!" in self.table.ast[i][j][k]:
-                        if self.table.ast[i][j][k][self.expr_ptr] == "!!":
-                            self.push_not_of(i, j, k)
-                        else:
-                            self.expr_ptr += 1
-
-                    # Iterates until an expression is reduced to its result
-                    while len(self.table.ast[i][j][k]) != 1:
-                        self.expr_ptr = 0
-                        while self.priority[self.priority_ptr] in self.table.ast[i][j][k]:
-                            if self.table.ast[i][j][k][self.expr_ptr] == self.priority[self.priority_ptr]:
-                                self.push_operation_of(i, j, k)
-                            else:
-                                self.expr_ptr += 1
-                        self.priority_ptr += 1
-
-            self.push_unhandled_statement(i)
+        self.roots: list[int] = []
+        self.build()
 
-    # The penultimate population of the map_entries dictionary
-    def push_entries_to_map(self):
-        iter_entries = iter(self.table.entries)
-        for entry in self.table.ast:
-            self.table.map_entries[next(iter_entries)] = self.memory[entry[0][0][0]]
+    """
+    The following four functions are the variable ordering heuristics, each giving statement indices from the top
+    level down. The order can make the difference between a handful of nodes and an exponential number of them
+    """
+    # The order the statements first appear in the entries, which is also the order of the table's columns
+    def appearance_order(self) -> list[int]:
+        return list(range(len(self.table.statements)))
+
+    def reverse_order(self) -> list[int]:
+        return self.appearance_order()[::-1]
+
+    # Statements used by the most operators go first
+    def frequency_order(self) -> list[int]:
+        uses = [0] * len(self.table.statements)
+        statement_of = {i: node[1] for i, node in enumerate(self.table.dag) if node[0] == "s"}
+        for node in self.table.dag:
+            if node[0] != "s":
+                for operand in node[1:]:
+                    if operand in statement_of:
+                        uses[statement_of[operand]] += 1
+        return sorted(self.appearance_order(), key=lambda i: -uses[i])
+
+    # The order a depth-first walk of each entry meets the statements, which keeps statements that are
+    # combined with each other close together
+    def depth_order(self) -> list[int]:
+        order = []
+        seen = set()
+        stack = list(reversed(self.table.ast))
+        while stack:
+            i = stack.pop()
+            if i in seen:
+                continue
+            seen.add(i)
+            node = self.table.dag[i]
+            if node[0] == "s":
+                order.append(node[1])
+            elif node[0] not in "01":
+                stack.extend(reversed(node[1:]))
+        seen = set(order)
+        return order + [i for i in self.appearance_order() if i not in seen]
+
+    # Gets the node for a level and its two children, reusing an existing one, and skipping the level entirely
+    # when both children are the same
+    def make(self, level: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+        key = (level, low, high)
+        if key not in self.unique:
+            self.unique[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self.unique[key]
+
+    def negate(self, u: int) -> int:
+        if u < 2:
+            return 1 - u
+        key = ("!!", u)
+        if key in self.cache:
+            self.cache_hits += 1
+            return self.cache[key]
+        level, low, high = self.nodes[u]
+        self.cache[key] = self.make(level, self.negate(low), self.negate(high))
+        return self.cache[key]
+
+    # Applies "&&", "||", or "++" to two nodes, splitting on whichever of their statements is at the top level
+    def apply(self, op: str, u: int, v: int) -> int:
+        if op == "&&":
+            if u == 0 or v == 0:
+                return 0
+            if u == 1 or u == v:
+                return v
+            if v == 1:
+                return u
+        elif op == "||":
+            if u == 1 or v == 1:
+                return 1
+            if v == 0 or u == v:
+                return u
+            if u == 0:
+                return v
+        else:
+            if u == v:
+                return 0
+            if u < 2 and v < 2:
+                return u ^ v
+            if u < 2:
+                return v if u == 0 else self.negate(v)
+            if v < 2:
+                return u if v == 0 else self.negate(u)
+
+        # Every operator is commutative, so the operands are sorted to share cache entries
+        key = (op, min(u, v), max(u, v))
+        if key in self.cache:
+            self.cache_hits += 1
+            return self.cache[key]
+
+        level = min(self.nodes[u][0], self.nodes[v][0])
+        u_low, u_high = self.nodes[u][1:] if self.nodes[u][0] == level else (u, u)
+        v_low, v_high = self.nodes[v][1:] if self.nodes[v][0] == level else (v, v)
+        self.cache[key] = self.make(level, self.apply(op, u_low, v_low), self.apply(op, u_high, v_high))
+        return self.cache[key]
+
+    # Converts every node of the table's dag, in order, so each shared subexpression is only converted once
+    def build(self):
+        converted = []
+        for node in self.table.dag:
+            if node[0] == "s":
+                converted.append(self.make(self.level[node[1]], 0, 1))
+            elif node[0] in "01":
+                converted.append(int(node[0]))
+            elif node[0] == "!!":
+                converted.append(self.negate(converted[node[1]]))
+            else:
+                u = self.apply("&&" if node[0][1] == "&" else "||" if node[0][1] == "|" else "++",
+                               converted[node[1]], converted[node[2]])
+                converted.append(self.negate(u) if node[0][0] == "!" else u)
+        self.roots = [converted[i] for i in self.table.ast]
+
+    # Entries can be given by their index, or by their text
+    def root(self, entry) -> int:
+        if isinstance(entry, str):
+            entry = self.table.entries.index(entry.translate(str.maketrans("", "", self.table.WHITESPACE)))
+        return self.roots[entry]
+
+    def is_tautology(self, entry) -> bool:
+        return self.root(entry) == 1
+
+    def is_satisfiable(self, entry) -> bool:
+        return self.root(entry) != 0
+
+    # Since the diagram is reduced, equivalent entries always end up as the very same node
+    def equivalent(self, first, second) -> bool:
+        return self.root(first) == self.root(second)
+
+    # The number of rows of the table where the entry is true. A node's count covers the levels below it, and every
+    # level skipped on the way to a child doubles that child's count
+    def count_models(self, entry) -> int:
+        root = self.root(entry)
+        counts = [0, 1]
+        for level, low, high in self.nodes[2:root+1]:
+            counts.append((counts[low] << (self.nodes[low][0] - level - 1))
+                          + (counts[high] << (self.nodes[high][0] - level - 1)))
+        return counts[root] << self.nodes[root][0]
+
+    # A row where the entry is true, as a map of each statement to its value, or None if there is no such row.
+    # Statements that don't matter along the way are set to 0
+    def satisfying_assignment(self, entry):
+        u = self.root(entry)
+        if u == 0:
+            return None
+        assignment = {statement: 0 for statement in self.table.statements}
+        while u > 1:
+            level, low, high = self.nodes[u]
+            if low == 0:
+                assignment[self.table.statements[self.order[level]]] = 1
+                u = high
+            else:
+                u = low
+        return assignment
+
+    # The number of nodes reachable from an entry, including the terminals
+    def size(self, entry) -> int:
+        seen = set()
+        stack = [self.root(entry)]
+        while stack:
+            u = stack.pop()
+            if u not in seen:
+                seen.add(u)
+                if u > 1:
+                    stack.extend(self.nodes[u][1:])
+        return len(seen)
+
+    def statistics(self) -> dict:
+        return {"order": [self.table.statements[i] for i in self.order],
+                "nodes": len(self.nodes),
+                "cache_entries": len(self.cache),
+                "cache_hits": self.cache_hits,
+                "entry_sizes": [self.size(i) for i in range(len(self.roots))]}
+
+
+class TableFile:
+    """
+    A table saved by Table.save, memory-mapped so its columns can be read without loading or copying them.
+    
+    The file starts with MAGIC, then the length of a JSON header holding the statements, entries, number of rows, and
+    the number of bytes per column. After padding to a multiple of 8 bytes come the statement columns and then the
+    entry columns, each packed as little-endian bits like IntColumns.packed, and padded to a multiple of 8 bytes
+    """
+    MAGIC = b"TTG1"
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fp:
+            self.map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(self.MAGIC)] != self.MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not a saved truth table")
+
+        header_length = struct.unpack_from("<I", self.map, len(self.MAGIC))[0]
+        header_start = len(self.MAGIC) + 4
+        header = json.loads(bytes(self.map[header_start:header_start + header_length]))
+
+        self.statements: list[str] = header["statements"]
+        self.entries: list[str] = header["entries"]
+        self.size: int = header["rows"]
+        self.column_bytes: int = header["column_bytes"]
+        self.data_start = -(-(header_start + header_length) // 8) * 8
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.map.close()
+
+    # Columns are found by their position among the statements then entries, or by name
+    def column_index(self, column) -> int:
+        if isinstance(column, int):
+            return column
+        if column in self.statements:
+            return self.statements.index(column)
+        return len(self.statements) + self.entries.index(column)
+
+    # A zero-copy view of a column's packed bits. Views must be released before the file can be closed
+    def column(self, column) -> memoryview:
+        start = self.data_start + self.column_index(column) * self.column_bytes
+        return memoryview(self.map)[start:start + -(-self.size // 8)]
+
+    def value(self, column, row: int) -> int:
+        return (self.map[self.data_start + self.column_index(column) * self.column_bytes + row // 8] >> (row % 8)) & 1
+
+    # Gets the ith row of the table: the value of each statement, followed by the value of each entry
+    def row(self, i: int) -> list[int]:
+        if not 0 <= i < self.size:
+            raise IndexError("row index out of range")
+        return [self.value(j, i) for j in range(len(self.statements) + len(self.entries))]
+
+    # Yields rows [start, stop) in the same form as row, expanding chunk_rows of them at a time
+    def rows(self, start=0, stop=None, chunk_rows=4096):
+        stop = self.size if stop is None else min(stop, self.size)
+        columns = [self.column(i) for i in range(len(self.statements) + len(self.entries))]
+        for chunk_start in range(start, stop, chunk_rows):
+            chunk_stop = min(chunk_start + chunk_rows, stop)
+            yield from ([int(j) for j in i] for i in zip(*[packed_bits(j, chunk_start, chunk_stop) for j in columns]))
+
+
+class FormulaCache:
+    """
+    A least recently used cache of parsed, simplified, and compiled entries, so the same entries are only parsed and
+    compiled once. With results, the entry columns of the whole table are kept too, so they aren't evaluated again.
+
+    Entries are keyed by their tokens without whitespace, with each statement renamed by the order it first appears
+    in, so "p && q" and "a&&b" share one key. The memory_items most recently used are kept in memory. Given a
+    directory, every entry is also saved to a file, and the least recently used files are removed once they take up
+    more than disk_bytes. Compiled code is only valid for the program and Python version that compiled it, so each
+    version has its own subdirectory, and the subdirectories of any other version are removed
+    """
+    PREFIX = "ttg-"
+
+    def __init__(self, directory=None, memory_items=256, disk_bytes=2**26, results=False):
+        self.memory = collections.OrderedDict()
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self.keep_results = results
+
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self.evictions = {"memory": 0, "disk": 0}
+
+        self.directory = None
+        self.disk_usage = 0
+        if directory is not None:
+            with open(__file__, "rb") as fp:
+                version = hashlib.sha256(fp.read() + sys.version.encode()).hexdigest()[:16]
+            os.makedirs(directory, exist_ok=True)
+            for name in os.listdir(directory):
+                if name.startswith(self.PREFIX) and name != self.PREFIX + version:
+                    shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+            self.directory = os.path.join(directory, self.PREFIX + version)
+            os.makedirs(self.directory, exist_ok=True)
+            self.evict()
+
+    # The key of a table's input and options, and its statements in the order they first appear. Input with a
+    # symbol the parser rejects has no key, so its error is raised by parsing it as usual
+    def key(self, table: Table):
+        names = {}
+        tokens = [f"{table.simplify:d}{table.drop_unused:d}"]
+        for entry in table.input.split(";"):
+            for match in Parser.token_pattern.finditer(entry):
+                token, text = match.lastgroup, match.group()
+                if token == "X" or token == "S" and not text.isalpha():
+                    return None, []
+                if token == "S":
+                    tokens.append("#%d" % names.setdefault(text, len(names)))
+                elif token != "W":
+                    tokens.append(text)
+            tokens.append(";")
+        if any(i not in names for i in table.fixed):
+            return None, []
+        tokens += sorted(f"#{names[i]}={value}" for i, value in table.fixed.items())
+        return " ".join(tokens), list(names)
+
+    # Restores a table's parsed entries and program on a hit, returning whether there was one
+    def load(self, table: Table) -> bool:
+        with table.stats.stage("cache") as record:
+            table.cache_key, names = self.key(table)
+            entry = None if table.cache_key is None else self.get(table.cache_key)
+            record.update(hit=entry is not None)
+            if entry is None:
+                return False
+
+            table.remove_whitespace()
+            table.statements = [names[i] for i in entry["statements"]]
+            table.statement_index = {statement: i for i, statement in enumerate(table.statements)}
+            table.dag = Dag()
+            for node in entry["nodes"]:
+                table.dag.node(*node)
+            table.ast = list(entry["ast"])
+            table.program = entry["program"]
+            return True
+
+    # Saves a compiled table, along with the columns of its entries if they are given and results are kept
+    def store(self, table: Table, results=None):
+        if table.cache_key is None:
+            return
+        entry = self.memory.get(table.cache_key)
+        if entry is None:
+            names = {name: i for i, name in enumerate(self.key(table)[1])}
+            entry = {"key": table.cache_key,
+                     "statements": [names[i] for i in table.statements],
+                     "nodes": list(table.dag),
+                     "ast": list(table.ast),
+                     "source": table.program.source,
+                     "temporaries": table.program.temporaries,
+                     "code": table.program.code,
+                     "results": None,
+                     "program": table.program}
+        elif results is None or not self.keep_results or entry["results"] is not None:
+            return
+        if results is not None and self.keep_results:
+            entry["results"] = [bytes(table.columns.packed(i)) for i in results]
+        self.remember(table.cache_key, entry)
+        self.write(entry)
+
+    # The packed entry columns of a table, if they were kept
+    def results(self, table: Table):
+        entry = self.memory.get(table.cache_key) if self.keep_results else None
+        return None if entry is None else entry["results"]
+
+    def get(self, key: str):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits["memory"] += 1
+            return self.memory[key]
+
+        entry = self.read(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits["disk"] += 1
+        entry["program"] = Program(entry["source"], entry["temporaries"], entry["code"])
+        self.remember(key, entry)
+        return entry
+
+    def remember(self, key: str, entry: dict):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+            self.evictions["memory"] += 1
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8", "surrogatepass")).hexdigest() + ".bin")
+
+    # A file that is missing, unreadable, or for another key that happens to share its name is a miss. Reading a
+    # file marks it as recently used
+    def read(self, key: str):
+        if self.directory is None:
+            return None
+        path = self.path(key)
+        try:
+            with open(path, "rb") as fp:
+                entry = marshal.load(fp)
+            os.utime(path)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        return entry if isinstance(entry, dict) and entry.get("key") == key else None
+
+    # Files are written under a temporary name and then renamed, so other processes never read a partial file. A file
+    # that is replaced, e.g. when results are added to a table, no longer counts towards disk_usage
+    def write(self, entry: dict):
+        if self.directory is None:
+            return
+        data = marshal.dumps({i: entry[i] for i in entry if i != "program"})
+        if len(data) > self.disk_bytes:
+            return
+        path = self.path(entry["key"])
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as fp:
+            fp.write(data)
+        with contextlib.suppress(OSError):
+            self.disk_usage -= os.path.getsize(path)
+        os.replace(temporary, path)
+
+        self.disk_usage += len(data)
+        if self.disk_usage > self.disk_bytes:
+            self.evict()
+
+    # Removes the least recently used files until the rest fit in disk_bytes
+    def evict(self):
+        files = []
+        for file in os.scandir(self.directory):
+            with contextlib.suppress(OSError):
+                if file.name.endswith(".bin"):
+                    stat = file.stat()
+                    files.append((stat.st_mtime, stat.st_size, file.path))
+
+        self.disk_usage = sum(i[1] for i in files)
+        for _, size, path in sorted(files):
+            if self.disk_usage <= self.disk_bytes:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(path)
+                self.evictions["disk"] += 1
+            self.disk_usage -= size
+
+    def statistics(self) -> dict:
+        return {"memory_entries": len(self.memory),
+                "memory_hits": self.hits["memory"],
+                "disk_hits": self.hits["disk"],
+                "misses": self.misses,
+                "memory_evictions": self.evictions["memory"],
+                "disk_evictions": self.evictions["disk"],
+                "disk_bytes": self.disk_usage}
+
+
+# Each worker process of Table.write_to keeps its own parsed and compiled copy of the table
+worker_table = None
+
+
+def start_worker(inp: str, backend: str, simplify: bool, drop_unused: bool, fixed: dict[str, int]):
+    global worker_table
+    worker_table = Table(inp, backend, simplify=simplify, drop_unused=drop_unused, fixed=fixed)
+    Parser(worker_table)
+    Compiler(worker_table)
+
+
+def render_range(bounds: tuple[int, int]) -> str:
+    columns, statements, entries = worker_table.evaluate_range(*bounds)
+    packed = [columns.packed(i) for i in statements + entries]
+    return "".join(worker_table.format_rows(packed, 0, columns.rows))
+
+
+# Evaluates one line of a batch into a record of its statements, entries, and each entry's column as a string of
+# "0"s and "1"s in row order. A line with bad syntax, or without one of the fixed statements, gets its error message
+# instead of results
+def batch_record(number: int, line: str, backend: str, stats=None, cache=None, drop_unused=False,
+                 fixed=None) -> dict:
+    record = {"line": number, "input": line, "statements": [], "entries": [], "columns": [], "error": None}
+    try:
+        table = Table(line, backend, stats, drop_unused=drop_unused, cache=cache, fixed=fixed)
+        Parser(table)
+        Interpreter(table)
+    except (SyntaxError, ValueError) as error:
+        record["error"] = str(error)
+        return record
+
+    record["statements"] = table.statements
+    record["entries"] = table.entries
+    record["columns"] = [packed_bits(table.columns.packed(table.map_entries[i]), 0, table.size)
+                         for i in table.entries]
+    return record
+
+
+# Writes one record per non-blank input line, either as a JSON object per line, or as CSV with lists joined by ";"
+def run_batch(lines, out, output_format="jsonl", backend="int", stats=None, cache=None, drop_unused=False,
+              fixed=None):
+    fields = ["line", "input", "statements", "entries", "columns", "error"]
+    writer = csv.writer(out, lineterminator="\n") if output_format == "csv" else None
+    if writer:
+        writer.writerow(fields)
+
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        record = batch_record(number, line, backend, stats, cache, drop_unused, fixed)
+        if writer:
+            writer.writerow([";".join(i) if isinstance(i, list) else i for i in record.values()])
+        else:
+            out.write(json.dumps(record) + "\n")
+
+
+# Reads entries and commands until :quit or the end of input, printing the table after every change
+def run_session(session: Session):
+    print("Each line adds its entries to the table. Entries are numbered from 1, left to right.\n"
+          "Commands:\n"
+          "\t:del N        -> remove entry N\n"
+          "\t:edit N entry -> replace entry N\n"
+          "\t:show         -> print the table again\n"
+          "\t:quit         -> stop\n")
+    while True:
+        try:
+            line = input("> ").strip()
+        except EOFError:
+            break
+        command, _, argument = line.partition(" ")
+        try:
+            if command == ":quit":
+                break
+            elif command == ":del":
+                session.remove(int(argument) - 1)
+            elif command == ":edit":
+                number, _, entry = argument.strip().partition(" ")
+                session.edit(int(number) - 1, entry)
+            elif line.startswith(":") and command != ":show":
+                raise ValueError(f"unknown command {command}")
+            elif not line:
+                continue
+            elif command != ":show":
+                session.add(line)
+        except SyntaxError as error:
+            print(f"Syntax error: {error}")
+            continue
+        except (ValueError, IndexError) as error:
+            print(f"Error: {error}")
+            continue
+        print()
+        session.table().write_to(sys.stdout)
+        print()
+
+
+# Each process of a Server's pool keeps a cache of the entries it has parsed and compiled, so the chunks of a request
+# and any repeated requests only parse and compile their entries once
+server_cache = None
+
+
+def server_table(inp: str, backend: str, drop_unused: bool, fixed: dict[str, int]) -> Table:
+    global server_cache
+    if server_cache is None:
+        server_cache = FormulaCache()
+    table = Table(inp, backend, drop_unused=drop_unused, cache=server_cache, fixed=fixed)
+    Parser(table)
+    if table.program is None:
+        Compiler(table)
+    return table
+
+
+# Parses a request's entries, giving what the response starts with, or the syntax error
+def server_prepare(inp: str, backend: str, drop_unused: bool, fixed: dict[str, int]) -> dict:
+    try:
+        table = server_table(inp, backend, drop_unused, fixed)
+    except SyntaxError as error:
+        return {"error": f"syntax error: {error}"}
+    except ValueError as error:
+        return {"error": str(error)}
+    return {"statements": table.statements, "entries": table.entries, "rows": table.size, "header": table.header()}
+
+
+# Evaluates rows [start, stop) of a request as rows laid out like the printed table, a list of 0s and 1s per row,
+# or a string of 0s and 1s per column
+def server_chunk(inp: str, backend: str, drop_unused: bool, fixed: dict[str, int], start: int, stop: int,
+                 output_format: str):
+    table = server_table(inp, backend, drop_unused, fixed)
+    columns, statements, entries = table.evaluate_range(start, stop)
+    if output_format == "table":
+        packed = [columns.packed(i) for i in statements + entries]
+        return "".join(table.format_rows(packed, 0, columns.rows))
+    bits = [packed_bits(columns.packed(i), 0, columns.rows) for i in statements + entries]
+    if output_format == "rows":
+        return [[int(j) for j in row] for row in zip(*bits)]
+    return bits
+
+
+class Server:
+    """
+    Evaluates tables for many clients at once over a local TCP or Unix socket, so they don't each start a process.
+    
+    A request is a line of JSON like {"id": 1, "entries": "p&&q ; q", "format": "table", "start": 0, "stop": 4},
+    where only entries is required, and it may also be a list of entries. format is "table" for rows laid out like
+    the printed table, "rows" for a list of 0s and 1s per row, or "columns" for a string of 0s and 1s per column.
+    start and stop select a range of rows, which defaults to the whole table. "fixed": {"p": 1} and
+    "drop_unused": true work like Table's, and default to the server's own.
+    
+    The response starts with a line of JSON holding the statements, entries, number of rows, and the range, plus
+    the header for the table format. Then every chunk of up to chunk_rows rows is sent as "data" as soon as it is
+    evaluated, in order, and a last line has "done" and the seconds taken. An error ends the response early with
+    an "error" line. Every line has the request's id. {"command": "metrics"} gets the server's metrics instead.
+    
+    asyncio handles the connections, while parsing and evaluating is done by a pool of worker processes. At most
+    twice as many chunks as workers are given to the pool at once, and the rest wait in a queue. A request is
+    stopped with an error if it has more than max_statements statements or max_rows rows, or takes longer than
+    timeout seconds, though chunks it already gave to the pool still count towards that limit until they finish
+    """
+    FORMATS = ("table", "rows", "columns")
+
+    def __init__(self, workers=None, backend="int", chunk_rows=65536, max_rows=2**24, max_statements=64,
+                 timeout=30.0, max_line=2**20, drop_unused=False, fixed=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.backend = "int" if backend == "numpy" and np is None else backend
+        self.chunk_rows = chunk_rows
+        self.max_rows = max_rows
+        self.max_statements = max_statements
+        self.timeout = timeout
+        self.max_line = max_line  # the longest request in bytes
+        self.drop_unused = drop_unused
+        self.fixed: dict[str, int] = dict(fixed or {})
+
+        # Both are created by start, since they belong to the running event loop
+        self.pool = None
+        self.slots = None
+
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.active = 0  # requests being responded to
+        self.queued = 0  # chunks waiting for the pool
+        self.running = 0  # chunks given to the pool
+        self.latencies = collections.deque(maxlen=1000)  # seconds taken by the latest requests
+
+    # Listens on "PORT", "HOST:PORT", or the path of a Unix socket, which is anything with a "/"
+    async def start(self, address: str):
+        self.pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+        self.slots = asyncio.Semaphore(2 * self.workers)
+        if "/" in address:
+            return await asyncio.start_unix_server(self.handle, address, limit=self.max_line)
+        host, _, port = address.rpartition(":")
+        return await asyncio.start_server(self.handle, host or "127.0.0.1", int(port), limit=self.max_line)
+
+    async def serve(self, address: str):
+        server = await self.start(address)
+        try:
+            async with server:
+                print("Serving on", ", ".join(str(i.getsockname()) for i in server.sockets), file=sys.stderr)
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+    # Responds to each request of a connection in turn
+    async def handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    await self.respond(line, writer)
+        except ValueError:
+            with contextlib.suppress(ConnectionError):
+                await self.send(writer, {"id": None, "error": f"requests can be at most {self.max_line} bytes"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def send(self, writer, message: dict):
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain()
+
+    async def respond(self, line: bytes, writer):
+        start = time.perf_counter()
+        self.requests += 1
+        self.active += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+            request_id = request.get("id")
+            if request.get("command") == "metrics":
+                await self.send(writer, {"id": request_id, "metrics": self.metrics()})
+                return
+            await asyncio.wait_for(self.evaluate(request, writer), self.timeout)
+            self.latencies.append(time.perf_counter() - start)
+            await self.send(writer, {"id": request_id, "done": True, "seconds": time.perf_counter() - start})
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.errors += 1
+            await self.send(writer, {"id": request_id, "error": f"timed out after {self.timeout} seconds"})
+        except ValueError as error:
+            self.errors += 1
+            await self.send(writer, {"id": request_id, "error": str(error)})
+        finally:
+            self.active -= 1
+
+    # Checks a request, then streams its rows, keeping up to one chunk per worker evaluating ahead of the one sent
+    async def evaluate(self, request: dict, writer):
+        inp = request.get("entries")
+        if isinstance(inp, list) and all(isinstance(i, str) for i in inp):
+            inp = ";".join(inp)
+        if not isinstance(inp, str):
+            raise ValueError("entries must be a string or a list of strings")
+        output_format = request.get("format", "table")
+        if output_format not in self.FORMATS:
+            raise ValueError("format must be one of " + ", ".join(self.FORMATS))
+        fixed = request.get("fixed", self.fixed)
+        if not isinstance(fixed, dict):
+            raise ValueError("fixed must be an object of statements and their values")
+        options = (inp, self.backend, bool(request.get("drop_unused", self.drop_unused)), fixed)
+
+        prepared = await self.run(server_prepare, *options)
+        if "error" in prepared:
+            raise ValueError(prepared["error"])
+        if len(prepared["statements"]) > self.max_statements:
+            raise ValueError(f"tables can have at most {self.max_statements} statements")
+        start, stop = request.get("start", 0), request.get("stop", prepared["rows"])
+        if not all(type(i) is int for i in (start, stop)) or not 0 <= start <= stop <= prepared["rows"]:
+            raise ValueError(f"start and stop must be row numbers from 0 to {prepared['rows']}")
+        if stop - start > self.max_rows:
+            raise ValueError(f"requests can have at most {self.max_rows} rows")
+
+        response = {"id": request.get("id"), "statements": prepared["statements"], "entries": prepared["entries"],
+                    "rows": prepared["rows"], "start": start, "stop": stop}
+        if output_format == "table":
+            response["header"] = prepared["header"]
+        await self.send(writer, response)
+
+        pending = collections.deque()
+        try:
+            for chunk_start in range(start, stop, self.chunk_rows):
+                chunk = options + (chunk_start, min(chunk_start + self.chunk_rows, stop), output_format)
+                pending.append(asyncio.ensure_future(self.run(server_chunk, *chunk)))
+                if len(pending) > self.workers:
+                    await self.send(writer, {"id": request.get("id"), "data": await pending.popleft()})
+            while pending:
+                await self.send(writer, {"id": request.get("id"), "data": await pending.popleft()})
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # Runs a function in the pool once there is room for it. A process can't be stopped partway through a chunk, so
+    # when a request times out, its chunks that have started keep their slot until they finish, and the ones that
+    # haven't are cancelled
+    async def run(self, function, *args):
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.queued -= 1
+        self.running += 1
+        try:
+            future = self.pool.submit(function, *args)
+        except BaseException:
+            self.finish()
+            raise
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.finish))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    # Frees the slot of a chunk the pool is done with
+    def finish(self):
+        self.running -= 1
+        self.slots.release()
+
+    def metrics(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {"requests": self.requests,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "active_requests": self.active,
+                "queued_chunks": self.queued,
+                "running_chunks": self.running,
+                "workers": self.workers,
+                "latency_mean": sum(latencies) / len(latencies) if latencies else None,
+                "latency_p50": self.percentile(latencies, 0.5),
+                "latency_p95": self.percentile(latencies, 0.95),
+                "latency_max": latencies[-1] if latencies else None}
+
+    # The nearest-rank percentile q of sorted values: the smallest value at least a fraction q of them are up to
+    @staticmethod
+    def percentile(values: list, q: float):
+        if not values:
+            return None
+        return values[min(len(values) - 1, math.ceil(q * len(values)) - 1)]
+
+
+def positive_int(text: str) -> int:
+    if not text.strip().isdigit() or int(text) < 1:
+        raise argparse.ArgumentTypeError(f"expected a whole number of at least 1, got \"{text}\"")
+    return int(text)
+
+
+# Parses fixed statements given like "p=1,q=0"
+def fixed_statements(text: str) -> dict[str, int]:
+    fixed = {}
+    for assignment in text.split(","):
+        statement, _, value = assignment.partition("=")
+        if not statement.strip().isalpha() or value.strip() not in ("0", "1"):
+            raise argparse.ArgumentTypeError(f"expected statement=0 or statement=1, got \"{assignment}\"")
+        fixed[statement.strip()] = int(value)
+    return fixed
 
 
 def print_instructions():
@@ -429,9 +2078,89 @@ def print_instructions():
 
 
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog="truth_table_generator")
+    arg_parser.add_argument("--backend", choices=BACKENDS, default="int",
+                            help="how columns are stored and evaluated; numpy falls back to int if not installed")
+    arg_parser.add_argument("--workers", type=positive_int, default=1,
+                            help="number of processes evaluating separate chunks of rows in parallel")
+    arg_parser.add_argument("--batch", metavar="FILE",
+                            help="evaluate every line of FILE (or - for stdin) without prompting, writing one record "
+                                 "per line to stdout")
+    arg_parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl",
+                            help="record format for --batch")
+    arg_parser.add_argument("--fix", type=fixed_statements, default={}, metavar="p=1,q=0",
+                            help="replace statements with fixed values, leaving them out of the table")
+    arg_parser.add_argument("--where", metavar="EXPR",
+                            help="only print rows where EXPR, an entry over the table's statements, is true")
+    arg_parser.add_argument("--only-true", action="store_true",
+                            help="only print rows where every entry is true")
+    arg_parser.add_argument("--diff", nargs=2, metavar="ENTRY",
+                            help="only print rows where two entries, given by number from 1 or by text, differ")
+    arg_parser.add_argument("--session", action="store_true",
+                            help="keep adding, removing, and editing entries of one table, only evaluating the "
+                                 "entries that change")
+    arg_parser.add_argument("--serve", metavar="ADDRESS",
+                            help="serve JSON requests on PORT, HOST:PORT, or a Unix socket path instead of prompting, "
+                                 "evaluating them in --workers processes")
+    arg_parser.add_argument("--timeout", type=float, default=30.0,
+                            help="seconds a --serve request may take")
+    arg_parser.add_argument("--max-rows", type=int, default=2**24,
+                            help="most rows a --serve request may ask for")
+    arg_parser.add_argument("--save", metavar="FILE",
+                            help="save the table to FILE as packed binary columns instead of printing it")
+    arg_parser.add_argument("--stats", action="store_true",
+                            help="print the time and sizes of each stage to stderr as JSON lines")
+    arg_parser.add_argument("--stats-memory", action="store_true",
+                            help="with --stats, also trace each stage's peak memory, which makes its time much slower")
+    arg_parser.add_argument("--drop-unused", action="store_true",
+                            help="leave out statements that simplification removed from every entry")
+    arg_parser.add_argument("--cache", metavar="DIR",
+                            help="keep parsed and compiled entries in DIR, so they are reused by later runs")
+    arg_parser.add_argument("--cache-results", action="store_true",
+                            help="also keep the evaluated columns of each table in the cache")
+    args = arg_parser.parse_args()
+
+    # Tracing memory slows every stage down by far more than the stage itself takes, so the times are only
+    # meaningful without it
+    stats = Stats(callback=lambda record: print(json.dumps(record), file=sys.stderr),
+                  memory=args.stats_memory) if args.stats else None
+    cache = FormulaCache(args.cache, results=args.cache_results) if args.cache or args.cache_results else None
+
+    if args.serve:
+        with contextlib.suppress(KeyboardInterrupt):
+            asyncio.run(Server(args.workers, args.backend, max_rows=args.max_rows, timeout=args.timeout,
+                               drop_unused=args.drop_unused, fixed=args.fix).serve(args.serve))
+        sys.exit()
+
+    if args.batch:
+        with (sys.stdin if args.batch == "-" else open(args.batch)) as batch:
+            run_batch(batch, sys.stdout, args.format, args.backend, stats, cache, args.drop_unused, args.fix)
+        sys.exit()
+
     print_instructions()
-    table = Table(input("Enter here: "))
-    parser = Parser(table)
-    interpreter = Interpreter(table)
-    table.generate()
-    print(table)
+    if args.session:
+        run_session(Session(args.backend, stats, cache=cache, drop_unused=args.drop_unused, fixed=args.fix))
+        sys.exit()
+    table = Table(input("Enter here: "), args.backend, stats, drop_unused=args.drop_unused, cache=cache,
+                  fixed=args.fix)
+    try:
+        parser = Parser(table)
+    except ValueError as error:
+        arg_parser.error(str(error))
+    if args.save:
+        table.save(args.save)
+        sys.exit()
+    if args.where is not None or args.only_true or args.diff:
+        try:
+            query = Query(table, args.where, args.only_true, args.diff)
+        except ValueError as error:
+            arg_parser.error(str(error))
+        print()
+        query.write_to(sys.stdout)
+        print()
+        sys.exit()
+    if args.workers == 1:
+        interpreter = Interpreter(table)
+    print()
+    table.write_to(sys.stdout, workers=args.workers)
+    print()
@@ -0,0 +1,198 @@
+# Times and memory-profiles each stage of the truth table generator on seeded, randomly generated formulas,
+# saving the results as JSON so that runs can be compared with --compare
+
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import random
+import time
+import tracemalloc
+
+# The program is a script rather than a package, so it is loaded straight from its file
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+spec = importlib.util.spec_from_file_location("truth_table_generator", os.path.join(ROOT, "__main__.py"))
+ttg = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ttg)
+
+OPERATOR_MIXES = {"all": ["&&", "||", "++", "!&", "!|", "!+"],
+                  "and_or": ["&&", "||"],
+                  "xor": ["++", "!+"]}
+
+PRESETS = {
+    "quick": [{"variables": v, "operators": "all", "depth": 3, "entries": 4, "length": 200} for v in [4, 8, 12, 16]],
+    "full": [{"variables": v, "operators": o, "depth": d, "entries": e, "length": n}
+             for v in [4, 8, 12, 16, 20]
+             for o in OPERATOR_MIXES
+             for d in [2, 6]
+             for e in [1, 16]
+             for n in [100, 10000]],
+}
+
+
+class FormulaGenerator:
+    def __init__(self, seed: int, variables: int, operators: str, depth: int):
+        self.random = random.Random(seed)
+        self.variables = [self.name(i) for i in range(variables)]
+        self.operators = OPERATOR_MIXES[operators]
+        self.depth = depth
+
+    # Statements must be alphabetic, so numbers are spelled with letters, i.e. 0 -> "a", 27 -> "cb"
+    @staticmethod
+    def name(i: int) -> str:
+        name = ""
+        while True:
+            name = chr(ord("a") + i % 26) + name
+            i //= 26
+            if i == 0:
+                return "v" + name
+
+    def term(self, depth: int) -> str:
+        roll = self.random.random()
+        if roll < 0.1:
+            return "!!" + self.term(depth)
+        if roll < 0.3 and depth < self.depth:
+            return "(" + self.expression(depth + 1, 40) + ")"
+        if roll < 0.33:
+            return self.random.choice("01")
+        return self.random.choice(self.variables)
+
+    # Keeps adding operators and terms until the expression is at least length characters long
+    def expression(self, depth: int, length: int) -> str:
+        expression = self.term(depth)
+        while len(expression) < length:
+            expression += f" {self.random.choice(self.operators)} {self.term(depth)}"
+        return expression
+
+    # Every variable is used at least once, so the table has exactly the requested number of statements
+    def entries(self, count: int, length: int) -> str:
+        entries = [self.expression(0, length // count) for _ in range(count)]
+        entries[0] += " && (" + " || ".join(self.variables) + ")"
+        return " ; ".join(entries)
+
+
+# Runs a stage once under tracemalloc for its peak memory, then repeat times for its best wall time.
+# setup builds fresh inputs for each run, and isn't measured
+def measure(setup, stage, repeat: int) -> dict:
+    gc.collect()
+    state = setup()
+    tracemalloc.start()
+    stage(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = float("inf")
+    for _ in range(repeat):
+        state = setup()
+        gc.collect()
+        start = time.perf_counter()
+        stage(state)
+        best = min(best, time.perf_counter() - start)
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def parsed(inp: str, backend: str):
+    table = ttg.Table(inp, backend)
+    ttg.Parser(table)
+    return table
+
+
+def compiled(inp: str, backend: str):
+    table = parsed(inp, backend)
+    ttg.Compiler(table)
+    return table
+
+
+def populated(inp: str, backend: str):
+    table = compiled(inp, backend)
+    table.populate_statements()
+    return table
+
+
+def interpreted(inp: str, backend: str):
+    table = populated(inp, backend)
+    ttg.Interpreter(table)
+    return table
+
+
+# A parser over the entries as they were given, whitespace and all, set up without parsing them so the tokenizer can be
+# timed on its own
+def unparsed(inp: str, backend: str):
+    parser = ttg.Parser.__new__(ttg.Parser)
+    parser.table = ttg.Table(inp, backend)
+    parser.entry = -1
+    parser.ptr = 0
+    return parser
+
+
+def tokenize(parser):
+    for parser.entry in range(len(parser.table.entries)):
+        for _ in parser.tokens():
+            pass
+
+
+def generate(table):
+    with open(os.devnull, "w") as sink:
+        table.write_to(sink)
+
+
+def run_case(case: dict, seed: int, repeat: int, backend: str, max_rows: int) -> dict:
+    inp = FormulaGenerator(seed, case["variables"], case["operators"], case["depth"]) \
+        .entries(case["entries"], case["length"])
+    stages = {
+        "remove_whitespace": (lambda: ttg.Table(inp, backend), lambda t: t.remove_whitespace()),
+        "tokenize": (lambda: unparsed(inp, backend), tokenize),
+        "parse": (lambda: ttg.Table(inp, backend), ttg.Parser),
+        "compile": (lambda: parsed(inp, backend), ttg.Compiler),
+        "populate_statements": (lambda: compiled(inp, backend), lambda t: t.populate_statements()),
+        "interpret": (lambda: populated(inp, backend), ttg.Interpreter),
+    }
+    if 2**case["variables"] <= max_rows:
+        stages["generate"] = (lambda: interpreted(inp, backend), generate)
+
+    return {"case": case, "input_length": len(inp),
+            "stages": {name: measure(setup, stage, repeat) for name, (setup, stage) in stages.items()}}
+
+
+# Prints the ratio of every stage's time against the same case and stage of an earlier run
+def compare(old: dict, new: dict):
+    old_results = {json.dumps(i["case"], sort_keys=True): i["stages"] for i in old["results"]}
+    for result in new["results"]:
+        key = json.dumps(result["case"], sort_keys=True)
+        if key not in old_results:
+            continue
+        print(key)
+        for name, stage in result["stages"].items():
+            if name in old_results[key]:
+                before = old_results[key][name]["seconds"]
+                print(f"\t{name:20} {before:10.6f}s -> {stage['seconds']:10.6f}s  "
+                      f"({stage['seconds'] / before if before else float('inf'):.2f}x)")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark each stage of the truth table generator")
+    arg_parser.add_argument("--preset", choices=PRESETS, default="quick")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage; the best is kept")
+    arg_parser.add_argument("--backend", choices=ttg.BACKENDS, default="int")
+    arg_parser.add_argument("--max-rows", type=int, default=2**16,
+                            help="skip the generate stage for tables with more rows than this")
+    arg_parser.add_argument("--output", default="bench_output.json")
+    arg_parser.add_argument("--compare", metavar="OLD_JSON", help="compare against the results of an earlier run")
+    args = arg_parser.parse_args()
+
+    results = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                        "preset": args.preset, "seed": args.seed, "repeat": args.repeat, "backend": args.backend},
+               "results": []}
+    for i, case in enumerate(PRESETS[args.preset]):
+        results["results"].append(run_case(case, args.seed + i, args.repeat, args.backend, args.max_rows))
+        print(json.dumps(case), {k: round(v["seconds"], 6) for k, v in results["results"][-1]["stages"].items()})
+
+    with open(args.output, "w") as fp:
+        json.dump(results, fp, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fp:
+            compare(json.load(fp), results)